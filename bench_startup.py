@@ -0,0 +1,88 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+# --- 核心配置 ---
+SPIDER_FILE = "河马短剧.py"
+# 启动预算（毫秒）：加载模块、构造 Spider + init + homeContent
+IMPORT_BUDGET_MS = 150
+FIRST_CALL_BUDGET_MS = 20
+RUNS = 5
+# --- 配置结束 ---
+
+# 在全新解释器中加载爬虫，模拟盒子上宿主首次导入
+PROBE_CODE = r'''
+import sys, json, time, importlib.util
+path = sys.argv[1]
+t0 = time.perf_counter()
+spec = importlib.util.spec_from_file_location("spider_bench", path)
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+t1 = time.perf_counter()
+spider = module.Spider()
+spider.init("")
+spider.homeContent(False)
+t2 = time.perf_counter()
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "first_call_ms": (t2 - t1) * 1000,
+                  "requests_loaded": "requests" in sys.modules}))
+'''
+
+
+def run_once(spider_file):
+    """运行一次探测，返回 (计时结果, -X importtime 输出)"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE_CODE, os.path.abspath(spider_file)],
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1]), proc.stderr
+
+
+def heaviest_imports(importtime_output, limit=10):
+    """解析 -X importtime 输出，返回顶层导入中累计耗时最多的模块"""
+    rows = []
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # 格式：import time:   self | cumulative | 模块名（子模块带缩进）
+        _, cumulative_us, name = line.split("|", 2)
+        if name.startswith("   "):
+            continue  # 只看顶层导入，子模块已计入其累计耗时
+        rows.append((int(cumulative_us.strip()), name.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main(spider_file=SPIDER_FILE, runs=RUNS, import_budget=IMPORT_BUDGET_MS, first_call_budget=FIRST_CALL_BUDGET_MS):
+    results = []
+    importtime_output = ""
+    for _ in range(runs):
+        result, importtime_output = run_once(spider_file)
+        results.append(result)
+
+    # 取中位数，减少冷缓存等偶发抖动
+    import_ms = sorted(r["import_ms"] for r in results)[len(results) // 2]
+    first_call_ms = sorted(r["first_call_ms"] for r in results)[len(results) // 2]
+    print(f"[BENCH] {spider_file}（{runs} 次中位数）")
+    print(f"[BENCH] 模块加载：{import_ms:.1f}ms（预算 {import_budget}ms）")
+    print(f"[BENCH] 首次调用 Spider()+init+homeContent：{first_call_ms:.1f}ms（预算 {first_call_budget}ms）")
+    print(f"[BENCH] 首次调用后 requests 已导入：{results[-1]['requests_loaded']}")
+    print("[BENCH] 顶层导入耗时（-X importtime，累计微秒）：")
+    for cumulative_us, name in heaviest_imports(importtime_output):
+        print(f"  {cumulative_us:>8}  {name}")
+
+    ok = import_ms <= import_budget and first_call_ms <= first_call_budget
+    if not ok:
+        print("[BENCH] 超出启动预算")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure spider import time and first-call latency against a budget")
+    parser.add_argument('--spider', default=SPIDER_FILE, help='Spider file to load')
+    parser.add_argument('--runs', type=int, default=RUNS, help='Fresh interpreter runs, median is reported')
+    parser.add_argument('--import-budget', type=float, default=IMPORT_BUDGET_MS, help='Module load budget in ms')
+    parser.add_argument('--first-call-budget', type=float, default=FIRST_CALL_BUDGET_MS, help='First call budget in ms')
+    args = parser.parse_args()
+    ok = main(spider_file=args.spider, runs=args.runs, import_budget=args.import_budget, first_call_budget=args.first_call_budget)
+    exit(0 if ok else 1)
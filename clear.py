@@ -1,11 +1,19 @@
-
 import os
+import argparse
 import subprocess
 from datetime import datetime, timedelta
 
-def run_command(cmd, check=True):
+# --- 核心配置 ---
+BRANCH = "master"
+# 保留最近几天的提交；0 表示全部压缩为一个初始提交
+KEEP_DAYS = 0
+ROOT_MESSAGE = "清理后的初始提交"
+# --- 配置结束 ---
+
+
+def run_command(cmd, check=True, env=None, input=None):
     """运行 shell 命令并处理错误"""
-    result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+    result = subprocess.run(cmd, shell=True, capture_output=True, text=True, env=env, input=input)
     if check and result.returncode != 0:
         print(f"命令执行失败: {cmd}")
         print(f"标准输出: {result.stdout}")
@@ -20,45 +28,109 @@ def get_old_commits(days=2):
     commits = run_command(cmd, check=False).stdout.strip().split('\n')
     return [c for c in commits if c]
 
-def delete_old_commits():
-    """删除2天前的提交并重写 master 分支"""
-    old_commits = get_old_commits()
-    if not old_commits:
-        print("没有找到2天前的提交。")
-        return
+def repo_size():
+    """返回仓库对象占用字节数（松散对象 + 打包文件），近似于完整克隆的大小"""
+    stats = {}
+    for line in run_command('git count-objects -v').stdout.splitlines():
+        key, _, value = line.partition(':')
+        stats[key.strip()] = int(value.strip() or 0)
+    return (stats.get('size', 0) + stats.get('size-pack', 0)) * 1024, stats.get('count', 0) + stats.get('in-pack', 0)
 
-    # 确保在 master 分支并拉取最新文件
-    run_command('git checkout master')
-    run_command('git pull origin master')
+def format_size(size):
+    return f"{size / 1024 / 1024:.2f}MB"
 
-    # 获取初始提交的哈希（只取第一个初始提交）
-    initial_commit = run_command('git rev-list --max-parents=0 HEAD | head -n 1', check=True).stdout.strip()
+def commit_env(commit):
+    """读取原提交的作者与提交者信息，重放时原样保留"""
+    fields = run_command(f'git log -1 --format="%an%x00%ae%x00%aI%x00%cn%x00%ce%x00%cI" {commit}').stdout.rstrip('\n').split('\0')
+    env = dict(os.environ)
+    for key, value in zip(("GIT_AUTHOR_NAME", "GIT_AUTHOR_EMAIL", "GIT_AUTHOR_DATE",
+                           "GIT_COMMITTER_NAME", "GIT_COMMITTER_EMAIL", "GIT_COMMITTER_DATE"), fields):
+        env[key] = value
+    return env
 
-    # 重置提交历史到初始提交，保留所有文件
-    run_command(f'git reset --soft {initial_commit}')
+def rebuild_history(keep_days=KEEP_DAYS):
+    """直接用现有 tree 对象构造新历史，不重新索引工作区文件，返回新的分支头"""
+    if keep_days <= 0:
+        tree = run_command('git rev-parse "HEAD^{tree}"').stdout.strip()
+        return run_command(f'git commit-tree {tree}', input=ROOT_MESSAGE).stdout.strip(), 0
 
-    # 重新添加所有文件
-    run_command('git rm -r --cached .')  # 移除所有文件以重新添加
-    run_command('git add .')  # 重新添加所有文件
+    since = (datetime.now() - timedelta(days=keep_days)).strftime('%Y-%m-%d %H:%M:%S')
+    kept = run_command(f'git rev-list --reverse --first-parent --since="{since}" HEAD').stdout.split()
+    if not kept:
+        # 最近没有提交，整体压缩为一个初始提交
+        return rebuild_history(0)
+    base = run_command(f'git rev-parse --verify -q "{kept[0]}^"', check=False).stdout.strip()
+    if not base:
+        print(f"最近 {keep_days} 天之前没有提交，无需压缩。")
+        return None, len(kept)
 
-    # 创建新提交
-    try:
-        run_command('git commit --allow-empty -m "清理后的初始提交"')
-    except subprocess.CalledProcessError as e:
-        print(f"提交失败: {e}")
+    # 新的根提交 = 最早保留提交之前的快照
+    base_tree = run_command(f'git rev-parse "{base}^{{tree}}"').stdout.strip()
+    parent = run_command(f'git commit-tree {base_tree}', env=commit_env(base), input=ROOT_MESSAGE).stdout.strip()
+    for commit in kept:
+        tree = run_command(f'git rev-parse "{commit}^{{tree}}"').stdout.strip()
+        message = run_command(f'git log -1 --format=%B {commit}').stdout
+        parent = run_command(f'git commit-tree {tree} -p {parent}', env=commit_env(commit), input=message).stdout.strip()
+    return parent, len(kept)
+
+def compact(keep_days=KEEP_DAYS, branch=BRANCH, push=True, aggressive=False):
+    """压缩历史：保留最近 keep_days 天的提交，其余合并进新的根提交，然后清理并重新打包"""
+    # 确保在目标分支并拉取最新文件
+    run_command(f'git checkout {branch}')
+    if push:
+        run_command(f'git pull origin {branch}')
+
+    size_before, objects_before = repo_size()
+    old_head = run_command('git rev-parse HEAD').stdout.strip()
+    new_head, kept = rebuild_history(keep_days)
+    if not new_head:
         return
 
-    # 强制推送重写的 master 分支
-    try:
-        run_command('git push origin master --force')
-    except subprocess.CalledProcessError as e:
-        print(f"强制推送 master 分支失败: {e}")
-        print("请确保已启用分支保护中的 '允许强制推送' 或有足够权限。")
+    # 分支头内容（tree）不变，只替换历史，工作区与暂存区无需改动
+    run_command(f'git update-ref -m "clear: 压缩历史" refs/heads/{branch} {new_head} {old_head}')
+    if kept:
+        print(f"已重建历史：保留最近 {keep_days} 天的 {kept} 个提交，新分支头 {new_head[:12]}")
+    else:
+        print(f"已压缩为单个初始提交 {new_head[:12]}")
+
+    if push:
+        try:
+            run_command(f'git push origin {branch} --force-with-lease={branch}:{old_head}')
+        except subprocess.CalledProcessError as e:
+            print(f"强制推送 {branch} 分支失败: {e}")
+            print("请确保已启用分支保护中的 '允许强制推送' 或有足够权限。")
+            return
+    else:
+        # 未推送时远程跟踪分支仍引用旧历史，旧对象无法被清理
+        print(f"未推送：origin/{branch} 仍引用旧历史，推送后再次运行 gc 才能释放空间。")
+
+    # 过期引用日志后旧提交不再可达，gc 会删除它们并重新打包
+    run_command('git reflog expire --expire=now --all')
+    run_command('git gc --prune=now' + (' --aggressive' if aggressive else ''))
+
+    size_after, objects_after = repo_size()
+    print(f"仓库大小：{format_size(size_before)}（{objects_before} 个对象）→ "
+          f"{format_size(size_after)}（{objects_after} 个对象）")
+
+def delete_old_commits(days=2, keep_days=KEEP_DAYS, branch=BRANCH, push=True, aggressive=False):
+    """存在 days 天前的提交时压缩 master 分支历史"""
+    old_commits = get_old_commits(days)
+    if not old_commits:
+        print(f"没有找到{days}天前的提交。")
         return
+    compact(keep_days=keep_days, branch=branch, push=push, aggressive=aggressive)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact repository history with git plumbing and prune old objects")
+    parser.add_argument('--days', type=int, default=2, help='Only compact when commits older than this exist')
+    parser.add_argument('--keep-days', type=int, default=KEEP_DAYS, help='Keep commits from the last N days (0 = squash all)')
+    parser.add_argument('--branch', default=BRANCH, help='Branch to compact')
+    parser.add_argument('--no-push', action='store_true', help='Rewrite locally without pulling or force-pushing')
+    parser.add_argument('--aggressive', action='store_true', help='Run gc --aggressive for a smaller (slower) repack')
+    args = parser.parse_args()
     try:
-        delete_old_commits()
+        delete_old_commits(days=args.days, keep_days=args.keep_days, branch=args.branch,
+                           push=not args.no_push, aggressive=args.aggressive)
     except Exception as e:
         print(f"发生错误: {e}")
         exit(1)
@@ -0,0 +1,366 @@
+import os
+import re
+import json
+
+# 2024.json 结构化编辑：一次解析、内存中批量修改、一次原子写回。
+# 只替换被修改值所在的文本区间，其余内容（缩进、空行、单行站点写法、CRLF）原样保留。
+
+_DECODER = json.JSONDecoder()
+_WS = re.compile(r'[ \t\r\n]*')
+
+
+class Node:
+    """JSON 值及其在原文中的区间 [start, end)"""
+
+    def __init__(self, kind, start, end, value=None, members=None, items=None):
+        self.kind = kind          # object / array / scalar
+        self.start = start
+        self.end = end
+        self.value = value        # scalar 的 Python 值
+        self.members = members    # object: [(key, Node)]
+        self.items = items        # array: [Node]
+
+    def get(self, key):
+        for k, node in self.members or []:
+            if k == key:
+                return node
+        return None
+
+    def to_python(self, text):
+        return json.loads(text[self.start:self.end])
+
+
+def _skip_ws(text, i):
+    return _WS.match(text, i).end()
+
+
+def _parse(text, i):
+    i = _skip_ws(text, i)
+    ch = text[i:i + 1]
+    if ch == '{':
+        members = []
+        start = i
+        i = _skip_ws(text, i + 1)
+        if text[i] == '}':
+            return Node('object', start, i + 1, members=members), i + 1
+        while True:
+            i = _skip_ws(text, i)
+            key, i = json.decoder.scanstring(text, i + 1)
+            i = _skip_ws(text, i)
+            if text[i] != ':':
+                raise ValueError(f"位置 {i} 缺少冒号")
+            node, i = _parse(text, i + 1)
+            members.append((key, node))
+            i = _skip_ws(text, i)
+            if text[i] == ',':
+                i += 1
+                continue
+            if text[i] == '}':
+                return Node('object', start, i + 1, members=members), i + 1
+            raise ValueError(f"位置 {i} 对象格式错误")
+    if ch == '[':
+        items = []
+        start = i
+        i = _skip_ws(text, i + 1)
+        if text[i] == ']':
+            return Node('array', start, i + 1, items=items), i + 1
+        while True:
+            node, i = _parse(text, i)
+            items.append(node)
+            i = _skip_ws(text, i)
+            if text[i] == ',':
+                i += 1
+                continue
+            if text[i] == ']':
+                return Node('array', start, i + 1, items=items), i + 1
+            raise ValueError(f"位置 {i} 数组格式错误")
+    value, end = _DECODER.raw_decode(text, i)
+    return Node('scalar', i, end, value=value), end
+
+
+def parse_spans(text):
+    root, end = _parse(text, 0)
+    if text[_skip_ws(text, end):].strip():
+        raise ValueError(f"位置 {end} 之后存在多余内容")
+    return root
+
+
+def _match(node, text, selector):
+    """数组元素选择器：int 为下标，dict 为字段全等匹配"""
+    if node.kind != 'object':
+        return False
+    for k, v in selector.items():
+        child = node.get(k)
+        if child is None or child.to_python(text) != v:
+            return False
+    return True
+
+
+class ConfigDocument:
+    """可往返编辑的 JSON 配置文档
+
+    更新以路径描述：路径段为对象键、数组下标或 {字段: 值} 选择器（匹配所有元素），
+    如 ["lives", {"url": "./li.m3u"}, "ua"]。所有修改先记录为文本区间替换，保存时一次写出。
+    """
+
+    def __init__(self, path=None, text=None):
+        self.path = path
+        if text is None:
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                text = f.read()
+        self.text = text
+        self.root = parse_spans(text)
+        self.newline = "\r\n" if "\r\n" in text else "\n"
+        self.edits = {}        # (start, end) -> [(tag, 文本)]；插入点 start == end 可有多段，按加入顺序拼接
+        self.removed = set()   # 已删除元素的 (start, end)
+        self.log = []
+
+    @property
+    def changed(self):
+        return bool(self.edits)
+
+    # ---- 查询 ----
+    def select(self, path):
+        nodes = [self.root]
+        for seg in path:
+            found = []
+            for node in nodes:
+                if isinstance(seg, str) and node.kind == 'object':
+                    child = node.get(seg)
+                    if child is not None:
+                        found.append(child)
+                elif isinstance(seg, int) and node.kind == 'array':
+                    if -len(node.items) <= seg < len(node.items):
+                        found.append(node.items[seg])
+                elif isinstance(seg, dict) and node.kind == 'array':
+                    found += [n for n in node.items if _match(n, self.text, seg)]
+            nodes = found
+        return nodes
+
+    def values(self, path):
+        return [n.to_python(self.text) for n in self.select(path)]
+
+    @property
+    def data(self):
+        return json.loads(self.render())
+
+    # ---- 修改 ----
+    def _edit(self, start, end, replacement, tag=None):
+        """替换区间 [start, end)；start == end 为插入，同一位置的多次插入依次保留，相同 tag 的插入后者覆盖前者
+
+        落在本批次已替换或删除区间内部的修改无法生效（输出时被外层区间覆盖），直接报错而不是静默丢弃。
+        """
+        for s, e in self.edits:
+            if s < e and start < e and s < end and not (start <= s and e <= end):
+                raise ValueError(f"位置 {start}-{end} 的修改落在本批次已替换或删除的区间 {s}-{e} 内，"
+                                 f"请先保存再修改，或直接在外层值中包含该修改")
+        if start < end:
+            self.edits[(start, end)] = [(tag, replacement)]
+            return
+        inserts = self.edits.setdefault((start, end), [])
+        for i, (existing, _) in enumerate(inserts):
+            if tag is not None and existing == tag:
+                inserts[i] = (tag, replacement)
+                return
+        inserts.append((tag, replacement))
+
+    def _strip_leading_comma(self, pos):
+        """插入点之前的元素被删光后，第一段插入内容不再需要前导逗号"""
+        inserts = self.edits.get((pos, pos))
+        if inserts and inserts[0][1].startswith(","):
+            inserts[0] = (inserts[0][0], inserts[0][1][1:])
+
+    def _insert_sep(self, pos):
+        """空容器内的插入点：已有插入内容时需要逗号分隔"""
+        return ", " if self.edits.get((pos, pos)) else ""
+
+    def set(self, path, value, create=True):
+        """设置路径上的值；末段键不存在且 create 为真时追加到对象末尾，返回修改处数"""
+        *parent_path, key = path
+        count = 0
+        for parent in self.select(parent_path):
+            dumped = json.dumps(value, ensure_ascii=False)
+            if parent.kind == 'object' and isinstance(key, str):
+                node = parent.get(key)
+                if node is None:
+                    if not create:
+                        continue
+                    # 以 (对象位置, 键) 为 tag，同一批次中重复设置同一新键时只保留最后一次
+                    tag = (parent.start, key)
+                    if parent.members:
+                        last = parent.members[-1][1]
+                        self._edit(last.end, last.end, f', "{key}": {dumped}', tag)
+                    else:
+                        pos = parent.start + 1
+                        tags = [t for t, _ in self.edits.get((pos, pos), [])]
+                        sep = (", " if tags.index(tag) else "") if tag in tags else self._insert_sep(pos)
+                        self._edit(pos, pos, f'{sep}"{key}": {dumped}', tag)
+                    count += 1
+                    continue
+            elif parent.kind == 'array' and isinstance(key, int) and -len(parent.items) <= key < len(parent.items):
+                node = parent.items[key]
+            else:
+                continue
+            if node.to_python(self.text) == value and (node.start, node.end) not in self.edits:
+                continue
+            self._edit(node.start, node.end, dumped)
+            count += 1
+        if count:
+            self.log.append(f"set {path} = {value!r}（{count} 处）")
+        return count
+
+    def remove(self, path):
+        """删除数组中被选中的元素（连同分隔逗号），返回删除个数"""
+        *parent_path, selector = path
+        count = 0
+        for array in self.select(parent_path):
+            if array.kind != 'array':
+                continue
+            items = array.items
+            doomed = [i for i, n in enumerate(items)
+                      if (isinstance(selector, int) and i == selector % len(items))
+                      or (isinstance(selector, dict) and _match(n, self.text, selector))]
+            doomed = [i for i in doomed if (items[i].start, items[i].end) not in self.removed]
+            kept = [i for i in range(len(items))
+                    if i not in doomed and (items[i].start, items[i].end) not in self.removed]
+            if doomed and not kept:
+                # 元素全部删除：清空整个数组内容，避免残留逗号
+                self._edit(items[0].start, items[-1].end, "")
+                for i in doomed:
+                    self.removed.add((items[i].start, items[i].end))
+                count += len(doomed)
+                self._strip_leading_comma(items[-1].end)
+                continue
+            for i in doomed:
+                later = [k for k in kept if k > i]
+                earlier = [k for k in kept if k < i]
+                if later:
+                    self._edit(items[i].start, items[later[0]].start, "")
+                elif earlier:
+                    self._edit(items[earlier[-1]].end, items[i].end, "")
+                else:
+                    self._edit(items[i].start, items[i].end, "")
+                self.removed.add((items[i].start, items[i].end))
+                count += 1
+        if count:
+            self.log.append(f"remove {path}（{count} 处）")
+        return count
+
+    def append(self, path, value):
+        """在数组末尾追加元素，沿用最后一个元素的缩进"""
+        count = 0
+        for array in self.select(path):
+            if array.kind != 'array':
+                continue
+            dumped = json.dumps(value, ensure_ascii=False)
+            if array.items:
+                last = array.items[-1]
+                line_start = self.text.rfind("\n", 0, last.start) + 1
+                indent = self.text[line_start:last.start]
+                indent = indent if not indent.strip() else ""
+                alive = any((n.start, n.end) not in self.removed for n in array.items)
+                comma = "," if alive or self.edits.get((last.end, last.end)) else ""
+                self._edit(last.end, last.end, f"{comma}{self.newline}{indent}{dumped}")
+            else:
+                pos = array.start + 1
+                self._edit(pos, pos, self._insert_sep(pos) + dumped)
+            count += 1
+        if count:
+            self.log.append(f"append {path}")
+        return count
+
+    # ---- 常用更新 ----
+    def set_live_ua(self, selector, ua):
+        return self.set(["lives", selector, "ua"], ua)
+
+    def set_site_jar(self, selector, jar):
+        return self.set(["sites", selector, "jar"], jar)
+
+    def set_site_enabled(self, selector, enabled, site=None):
+        """停用即从 sites 中删除；启用时站点缺失则按 site 定义追加"""
+        if not enabled:
+            return self.remove(["sites", selector])
+        if self.select(["sites", selector]):
+            return 0
+        if site is None:
+            raise ValueError(f"启用站点 {selector} 失败：配置中不存在且未提供站点定义")
+        return self.append(["sites"], site)
+
+    def apply(self, updates):
+        """批量执行声明式更新，每项形如 {"op": "set"/"remove"/"append"/"live_ua"/"site_jar"/"site_enabled", ...}"""
+        count = 0
+        for update in updates:
+            op = update["op"]
+            if op == "set":
+                count += self.set(update["path"], update["value"], update.get("create", True))
+            elif op == "remove":
+                count += self.remove(update["path"])
+            elif op == "append":
+                count += self.append(update["path"], update["value"])
+            elif op == "live_ua":
+                count += self.set_live_ua(update["match"], update["value"])
+            elif op == "site_jar":
+                count += self.set_site_jar(update["match"], update["value"])
+            elif op == "site_enabled":
+                count += self.set_site_enabled(update["match"], update["value"], update.get("site"))
+            else:
+                raise ValueError(f"未知更新类型: {op}")
+        return count
+
+    # ---- 输出 ----
+    def render(self):
+        spans = sorted(self.edits.items(), key=lambda e: (e[0][0], -e[0][1]))
+        out = []
+        pos = 0
+        for (start, end), parts in spans:
+            if start < pos:
+                # 已被更大的删除区间覆盖
+                continue
+            out.append(self.text[pos:start])
+            out += [text for _, text in parts]
+            pos = end
+        out.append(self.text[pos:])
+        return "".join(out)
+
+    def validate(self, text=None):
+        """校验输出仍为合法 JSON，且 lives/sites 结构完整"""
+        data = json.loads(self.render() if text is None else text)
+        if isinstance(data, dict):
+            for live in data.get("lives", []):
+                if not live.get("url"):
+                    raise ValueError(f"直播源缺少 url: {live}")
+            keys = set()
+            for site in data.get("sites", []):
+                for field in ("key", "name", "type", "api"):
+                    if field not in site:
+                        raise ValueError(f"站点缺少 {field}: {site}")
+                if site["key"] in keys:
+                    print(f"[WARN] 站点 key 重复: {site['key']}")
+                keys.add(site["key"])
+        return data
+
+    def save(self, path=None):
+        """校验后原子写回；无改动时不写，返回是否写入"""
+        path = path or self.path
+        if not self.edits and path == self.path:
+            return False
+        text = self.render()
+        self.validate(text)
+        write_atomic(path, text)
+        return True
+
+    def derive(self, path, updates):
+        """基于当前内存状态生成派生配置，不影响本文档"""
+        child = ConfigDocument(path=path, text=self.render())
+        child.apply(updates)
+        text = child.render()
+        child.validate(text)
+        write_atomic(path, text)
+        return child
+
+
+def write_atomic(path, text):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
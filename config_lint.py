@@ -0,0 +1,185 @@
+import os
+import json
+import argparse
+
+from config_engine import ConfigDocument, write_atomic
+
+# --- 核心配置 ---
+CONFIG_FILE = "2024.json"
+# 由 config-min.yml 在 2024.json 变化时生成，DIY2024.json 指向该文件
+OUTPUT_FILE = "2024.min.json"
+# 开启内联时，./lib/*.json 形式的 ext 小于该字节数才内联：配置会变大，但省去盒子启动时的一次请求
+INLINE_MAX_BYTES = 4096
+# 见 README.md 备注：外挂 jar（本地或 https）不得多于 2 个，否则 wogg 网盘播放必挂
+MAX_EXTERNAL_JARS = 2
+# 估算启动耗时用的加载速度（低端盒子，约 2MB/s）
+LOAD_BYTES_PER_SEC = 2 * 1024 * 1024
+# --- 配置结束 ---
+
+
+def local_path(ref):
+    """把 ./xxx 形式的本地引用转换为仓库内路径，远程或非路径返回 None"""
+    if not isinstance(ref, str) or not ref.startswith("./"):
+        return None
+    return ref[2:].split("?", 1)[0]
+
+
+def file_size(ref):
+    path = local_path(ref)
+    if path and os.path.isfile(path):
+        return os.path.getsize(path)
+    return None
+
+
+def canonical(obj):
+    return json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+def dedupe_sites(sites):
+    """同一 key 只保留第一个站点"""
+    seen = set()
+    kept = []
+    for site in sites:
+        if site.get("key") in seen:
+            print(f"[LINT] 删除重复站点：{site.get('key')}（{site.get('name')}）")
+            continue
+        seen.add(site.get("key"))
+        kept.append(site)
+    return kept
+
+
+def normalize_shared_blocks(sites):
+    """统计重复的 ext/style 对象并统一键顺序；JSON 无法引用共享对象，重复项只报告、不合并"""
+    counts = {}
+    for site in sites:
+        for field in ("ext", "style"):
+            value = site.get(field)
+            if isinstance(value, dict):
+                key = (field, canonical(value))
+                counts[key] = counts.get(key, 0) + 1
+                site[field] = json.loads(key[1])
+    for (field, value), n in sorted(counts.items(), key=lambda kv: -kv[1]):
+        if n > 1:
+            print(f"[LINT] {field} 重复 {n} 次：{value}")
+    return sum(n - 1 for n in counts.values())
+
+
+def check_external_jars(data):
+    jars = []
+    for site in data.get("sites", []):
+        jar = site.get("jar")
+        if jar and jar != data.get("spider") and jar not in jars:
+            jars.append(jar)
+    if len(jars) > MAX_EXTERNAL_JARS:
+        print(f"[WARN] 外挂 jar 共 {len(jars)} 个，超过 {MAX_EXTERNAL_JARS} 个，wogg 网盘播放可能失败：")
+        for jar in jars:
+            print(f"        {jar}")
+    else:
+        print(f"[INFO] 外挂 jar {len(jars)} 个：{', '.join(jars)}")
+    return jars
+
+
+def inline_small_ext(sites, inline_max=INLINE_MAX_BYTES):
+    """./lib/*.json 形式的小 ext 文件直接内联为对象"""
+    count = 0
+    for site in sites:
+        ext = site.get("ext")
+        path = local_path(ext)
+        if not path or not path.startswith("lib/") or not path.endswith(".json"):
+            continue
+        size = file_size(ext)
+        if size is None or size > inline_max:
+            continue
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                site["ext"] = json.load(f)
+        except ValueError as e:
+            print(f"[WARN] {path} 不是合法 JSON，保留引用：{e}")
+            continue
+        print(f"[LINT] 内联 {site['key']} 的 ext：{ext}（{size} 字节）")
+        count += 1
+    return count
+
+
+def startup_cost(data):
+    """估算每个站点的启动加载量：jar（同一 jar 只计一次）+ 本地 api/ext 脚本"""
+    loaded_jars = set()
+    report = []
+    for site in data.get("sites", []):
+        cost = 0
+        parts = []
+        remote = []
+        if site.get("type") == 3 and str(site.get("api", "")).startswith("csp_"):
+            jar = site.get("jar") or data.get("spider")
+            if jar not in loaded_jars:
+                size = file_size(jar)
+                loaded_jars.add(jar)
+                if size is None:
+                    remote.append(jar)
+                else:
+                    cost += size
+                    parts.append(f"jar {size // 1024}KB")
+        for field in ("api", "ext"):
+            ref = site.get(field)
+            if not isinstance(ref, str) or ref.startswith("csp_"):
+                continue
+            size = file_size(ref)
+            if size is not None:
+                cost += size
+                parts.append(f"{field} {size // 1024}KB")
+            elif ref.startswith(("http://", "https://")):
+                remote.append(ref)
+        report.append((site.get("key"), cost, parts, remote))
+    return report
+
+
+def print_report(report):
+    total = 0
+    print("[REPORT] 站点启动成本（按本地字节数降序）：")
+    for key, cost, parts, remote in sorted(report, key=lambda r: -r[1]):
+        total += cost
+        if not cost and not remote:
+            continue
+        seconds = cost / LOAD_BYTES_PER_SEC
+        extra = f"，远程或缺失 {len(remote)} 个" if remote else ""
+        print(f"  {key}: {cost // 1024}KB ≈ {seconds:.2f}s（{', '.join(parts) or '-'}{extra}）")
+    print(f"[REPORT] 合计本地加载 {total // 1024}KB ≈ {total / LOAD_BYTES_PER_SEC:.2f}s")
+
+
+def minify(data):
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def main(config_file=CONFIG_FILE, output_file=OUTPUT_FILE, inline=False, inline_max=INLINE_MAX_BYTES):
+    doc = ConfigDocument(config_file)
+    data = doc.validate()
+    original_size = len(doc.text.encode("utf-8"))
+
+    check_external_jars(data)
+    data["sites"] = dedupe_sites(data.get("sites", []))
+    dup_blocks = normalize_shared_blocks(data["sites"])
+    minified_size = len(minify(data).encode("utf-8"))
+    inlined = inline_small_ext(data["sites"], inline_max) if inline else 0
+    print_report(startup_cost(data))
+
+    text = minify(data)
+    new_size = len(text.encode("utf-8"))
+    print(f"[SUMMARY] 压缩：{original_size} 字节 → {minified_size} 字节"
+          f"（{(minified_size - original_size) * 100 / original_size:+.1f}%）")
+    print(f"[REPORT] 重复 ext/style {dup_blocks} 处（仅统计，未合并）")
+    if inline:
+        print(f"[SUMMARY] 内联 ext {inlined} 个：{new_size - minified_size:+d} 字节，启动时少 {inlined} 次请求")
+    if output_file:
+        doc.validate(text)
+        write_atomic(output_file, text)
+        print(f"[SUMMARY] 已写入 {output_file}（{new_size} 字节）")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lint and minify 2024.json for faster box start-up")
+    parser.add_argument('--config', default=CONFIG_FILE, help='Config file to lint')
+    parser.add_argument('--output', default=OUTPUT_FILE, help='Minified output path (empty to only report)')
+    parser.add_argument('--inline', action='store_true', help='Inline small ./lib/*.json ext files (bigger file, fewer requests)')
+    parser.add_argument('--inline-max', type=int, default=INLINE_MAX_BYTES, help='Inline ./lib/*.json ext files up to this size')
+    args = parser.parse_args()
+    main(config_file=args.config, output_file=args.output, inline=args.inline, inline_max=args.inline_max)
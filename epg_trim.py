@@ -0,0 +1,177 @@
+import io
+import os
+import re
+import gzip
+import argparse
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta, timezone
+
+import requests
+
+from playlist_utils import read_text_lines, parse_m3u_lines, get_header_attr, set_header_attr, write_text_lines
+
+# --- 核心配置 ---
+PLAYLISTS = ["li.m3u", "1.m3u"]
+EPG_SOURCES = [
+    "https://11.112114.xyz/pp.xml",
+    "https://epg.tv.darwinchow.com/epg.xml",
+]
+OUTPUT_FILE = "epg.xml.gz"
+# 播放列表头部引用的裁剪后 EPG 地址（盒子无法解析相对路径，这里用仓库的加速地址）
+OUTPUT_URL = "https://ghfast.top/github.com/klcb2010/TX/raw/master/epg.xml.gz"
+PAST_HOURS = 6
+FUTURE_HOURS = 48
+# --- 配置结束 ---
+
+NAME_SUFFIX_PATTERN = re.compile(r'[\s\-_]*(?:MCP|MST|HD|高清|超清)$', re.I)
+NAME_SEP_PATTERN = re.compile(r'[\s\-_]+')
+XMLTV_TIME_PATTERN = re.compile(r'^(\d{14})(?:\s*([+-]\d{4}))?')
+
+
+def normalize_name(name):
+    """频道名归一化：去空白、连字符及清晰度后缀，统一大写"""
+    name = NAME_SUFFIX_PATTERN.sub('', name.strip())
+    return NAME_SEP_PATTERN.sub('', name).upper()
+
+
+def collect_channels(playlists):
+    """收集播放列表中的频道标识（tvg-id / tvg-name / 显示名）及其 EPG 源"""
+    wanted = set()
+    sources = []
+    for path in playlists:
+        lines = read_text_lines(path)
+        if not lines:
+            continue
+        for url in get_header_attr(lines, "x-tvg-url"):
+            if url != OUTPUT_URL and url not in sources:
+                sources.append(url)
+        for entry in parse_m3u_lines(lines):
+            for value in (entry["attrs"].get("tvg-id"), entry["attrs"].get("tvg-name"), entry["name"]):
+                if value:
+                    wanted.add(normalize_name(value))
+    wanted.discard("")
+    return wanted, sources
+
+
+def parse_xmltv_time(value):
+    m = XMLTV_TIME_PATTERN.match(value or "")
+    if not m:
+        return None
+    dt = datetime.strptime(m.group(1), "%Y%m%d%H%M%S")
+    offset = m.group(2) or "+0000"
+    sign = 1 if offset[0] == "+" else -1
+    delta = timedelta(hours=int(offset[1:3]), minutes=int(offset[3:5]))
+    return dt.replace(tzinfo=timezone(sign * delta))
+
+
+def open_stream(url, timeout=30):
+    """以流的方式打开 EPG，自动处理 gzip 压缩"""
+    response = requests.get(url, stream=True, timeout=timeout)
+    response.raise_for_status()
+    response.raw.decode_content = True
+    response.raw.auto_close = False
+    stream = io.BufferedReader(response.raw)
+    if stream.peek(2)[:2] == b"\x1f\x8b":
+        stream = gzip.GzipFile(fileobj=stream)
+    return response, stream
+
+
+def trim_source(stream, wanted, window_start, window_end, out, seen_channels):
+    """增量解析单个 XMLTV 流，只写出目标频道及时间窗口内的节目，返回 (频道数, 节目数)"""
+    kept_ids = set()
+    channels = programmes = 0
+    context = ET.iterparse(stream, events=("start", "end"))
+    _, root = next(context)
+    for event, elem in context:
+        if event != "end":
+            continue
+        if elem.tag == "channel":
+            channel_id = elem.get("id", "")
+            names = [channel_id] + [n.text or "" for n in elem.findall("display-name")]
+            # 同一频道只采用最先提供它的源，避免节目重复
+            if channel_id not in seen_channels and any(normalize_name(n) in wanted for n in names):
+                kept_ids.add(channel_id)
+                seen_channels.add(channel_id)
+                out.write(ET.tostring(elem, encoding="utf-8"))
+                channels += 1
+            root.clear()
+        elif elem.tag == "programme":
+            if elem.get("channel") in kept_ids:
+                start = parse_xmltv_time(elem.get("start"))
+                stop = parse_xmltv_time(elem.get("stop")) or start
+                if start and stop and stop >= window_start and start <= window_end:
+                    out.write(ET.tostring(elem, encoding="utf-8"))
+                    programmes += 1
+            root.clear()
+    return channels, programmes
+
+
+def update_playlist_headers(playlists, url):
+    for path in playlists:
+        lines = read_text_lines(path)
+        if lines and set_header_attr(lines, "x-tvg-url", url):
+            write_text_lines(path, lines)
+            print(f"[SYNC] 已更新 {path} 的 x-tvg-url → {url}")
+
+
+def main(playlists=PLAYLISTS, output_file=OUTPUT_FILE, output_url=OUTPUT_URL,
+         past_hours=PAST_HOURS, future_hours=FUTURE_HOURS, rewrite_header=True):
+    wanted, sources = collect_channels(playlists)
+    # 头部被改写后原始地址不再出现在列表里，始终带上默认源
+    for url in EPG_SOURCES:
+        if url not in sources:
+            sources.append(url)
+    print(f"[INFO] 播放列表频道标识：{len(wanted)} 个，EPG 源：{len(sources)} 个")
+    if not wanted:
+        print("[WARN] 未找到任何频道，跳过 EPG 裁剪")
+        return False
+
+    now = datetime.now(timezone.utc)
+    window_start = now - timedelta(hours=past_hours)
+    window_end = now + timedelta(hours=future_hours)
+
+    tmp_file = f"{output_file}.tmp"
+    seen_channels = set()
+    total_channels = total_programmes = 0
+    ok_sources = 0
+    with gzip.open(tmp_file, "wb") as out:
+        out.write(b'<?xml version="1.0" encoding="UTF-8"?>\n<tv generator-info-name="TX epg_trim">\n')
+        for url in sources:
+            try:
+                print(f"[下载] 正在流式解析 {url}...")
+                response, stream = open_stream(url)
+                with response:
+                    channels, programmes = trim_source(stream, wanted, window_start, window_end, out, seen_channels)
+                total_channels += channels
+                total_programmes += programmes
+                ok_sources += 1
+                print(f"[解析] {url}：保留频道 {channels} 个，节目 {programmes} 条")
+            except Exception as e:
+                print(f"[解析] 失败：{url} → {str(e)}")
+        out.write(b"</tv>\n")
+
+    if not ok_sources:
+        os.remove(tmp_file)
+        print("[ERROR] 所有 EPG 源均失败，保留旧文件")
+        return False
+    os.replace(tmp_file, output_file)
+    print(f"[SUMMARY] 频道 {total_channels} 个，节目 {total_programmes} 条，"
+          f"文件大小 {os.path.getsize(output_file)} 字节")
+
+    if rewrite_header:
+        update_playlist_headers(playlists, output_url)
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Trim upstream XMLTV EPG to channels in our playlists")
+    parser.add_argument('--output', default=OUTPUT_FILE, help='Trimmed gzipped EPG output path')
+    parser.add_argument('--url', default=OUTPUT_URL, help='Public URL written to x-tvg-url')
+    parser.add_argument('--past-hours', type=int, default=PAST_HOURS, help='Keep programmes ending within this many past hours')
+    parser.add_argument('--future-hours', type=int, default=FUTURE_HOURS, help='Keep programmes starting within this many future hours')
+    parser.add_argument('--no-header', action='store_true', help='Do not rewrite x-tvg-url in playlists')
+    parser.add_argument('playlists', nargs='*', default=PLAYLISTS, help='Playlists to collect channels from')
+    args = parser.parse_args()
+    ok = main(playlists=args.playlists, output_file=args.output, output_url=args.url,
+              past_hours=args.past_hours, future_hours=args.future_hours, rewrite_header=not args.no_header)
+    exit(0 if ok else 1)
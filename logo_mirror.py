@@ -0,0 +1,229 @@
+import io
+import os
+import re
+import json
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# --- 核心配置 ---
+PLAYLISTS = ["li.m3u", "1.m3u"]
+APP_FILE = "app.json"
+MIRROR_DIR = "logo/tv"
+MANIFEST_FILE = "logo/manifest.json"
+# 写回列表时使用的前缀，与 2024.json 中 ./li.m3u、./lib/ 等相对路径保持一致，
+# 图片与列表同源加载，不再经过 ghfast.top 等跨域代理
+BASE_URL = "./"
+# 曾经写回过的前缀，运行时统一改写为 BASE_URL
+LEGACY_BASE_URLS = ["./", "https://ghfast.top/github.com/klcb2010/TX/raw/master/"]
+# 指向本仓库 logo 目录的远程地址：图片本就由仓库托管，保持原引用，不下载也不复制
+SELF_LOGO_PATTERN = re.compile(r'^https?://.*?/klcb2010/TX/raw/master/(logo/[^"?#]+)$')
+MAX_SIZE = (160, 160)
+WORKERS = 8
+TIMEOUT = 15
+# --- 配置结束 ---
+
+TVG_LOGO_PATTERN = re.compile(r'(tvg-logo\s*=\s*")([^"]+)(")')
+APP_ICON_PATTERN = re.compile(r'("icon"\s*:\s*")([^"]+)(")')
+HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"}
+
+
+def read_raw(path):
+    """保留原换行符读取文本（app.json 为 CRLF）"""
+    if not os.path.exists(path):
+        print(f"[WARN] 文件未找到: {path}")
+        return None
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return f.read()
+
+
+def write_raw(path, content):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def load_manifest(path=MANIFEST_FILE):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {"urls": {}}
+
+
+def save_manifest(manifest, path=MANIFEST_FILE):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def mirrored_file(url, base_url):
+    """已指向镜像目录的引用返回对应的本地文件路径，否则返回 None"""
+    for prefix in [base_url] + LEGACY_BASE_URLS:
+        if url.startswith(prefix + MIRROR_DIR + "/"):
+            return url[len(prefix):]
+    return None
+
+
+def collect_refs():
+    """收集播放列表 tvg-logo 与 app.json icon 中的全部图片引用"""
+    refs = []
+    for path in PLAYLISTS:
+        content = read_raw(path) or ""
+        refs += [m.group(2) for m in TVG_LOGO_PATTERN.finditer(content)]
+    content = read_raw(APP_FILE) or ""
+    refs += [m.group(2) for m in APP_ICON_PATTERN.finditer(content)]
+    return refs
+
+
+def collect_urls(base_url):
+    """收集尚未镜像的外部图片地址（本仓库托管的图片除外）"""
+    seen = set()
+    return [u for u in collect_refs() if u.startswith(("http://", "https://"))
+            and not mirrored_file(u, base_url) and not SELF_LOGO_PATTERN.match(u)
+            and not (u in seen or seen.add(u))]
+
+
+def process_image(data):
+    """缩放并重新编码为 PNG；未安装 Pillow 或无法识别时原样返回"""
+    if Image is None:
+        return data, None
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img.thumbnail(MAX_SIZE)
+            if img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA")
+            out = io.BytesIO()
+            img.save(out, format="PNG", optimize=True)
+            return out.getvalue(), ".png"
+    except Exception as e:
+        print(f"[WARN] 图片处理失败，保留原图：{e}")
+        return data, None
+
+
+def guess_ext(url, data):
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return ".png"
+    if data[:3] == b"\xff\xd8\xff":
+        return ".jpg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return ".webp"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return ".gif"
+    ext = os.path.splitext(url.split("?", 1)[0])[1].lower()
+    return ext if ext in (".png", ".jpg", ".jpeg", ".webp", ".gif", ".svg") else ".png"
+
+
+def store_image(url, data):
+    """按内容哈希落盘，相同内容只保存一份，返回 (sha256, 相对路径)"""
+    digest = hashlib.sha256(data).hexdigest()
+    processed, ext = process_image(data)
+    file_path = f"{MIRROR_DIR}/{digest[:16]}{ext or guess_ext(url, data)}"
+    if not os.path.exists(file_path):
+        with open(file_path, "wb") as f:
+            f.write(processed)
+    return digest, file_path
+
+
+def fetch_logo(url, record):
+    """下载单个图片，带 ETag/Last-Modified 条件请求，返回新的记录或 None"""
+    headers = dict(HEADERS)
+    if record and os.path.exists(record.get("file", "")):
+        if record.get("etag"):
+            headers["If-None-Match"] = record["etag"]
+        if record.get("last_modified"):
+            headers["If-Modified-Since"] = record["last_modified"]
+    try:
+        response = requests.get(url, headers=headers, timeout=TIMEOUT)
+        if response.status_code == 304:
+            return record
+        response.raise_for_status()
+    except Exception as e:
+        print(f"[下载] 失败：{url} → {str(e)}")
+        return record
+    digest, file_path = store_image(url, response.content)
+    return {
+        "sha256": digest,
+        "file": file_path,
+        "etag": response.headers.get("ETag", ""),
+        "last_modified": response.headers.get("Last-Modified", ""),
+    }
+
+
+def rewrite_file(path, pattern, mapping):
+    content = read_raw(path)
+    if content is None:
+        return 0
+    count = 0
+
+    def repl(m):
+        nonlocal count
+        new_url = mapping.get(m.group(2))
+        if not new_url or new_url == m.group(2):
+            return m.group(0)
+        count += 1
+        return f"{m.group(1)}{new_url}{m.group(3)}"
+
+    new_content = pattern.sub(repl, content)
+    if new_content != content:
+        write_raw(path, new_content)
+    return count
+
+
+def main(base_url=BASE_URL, workers=WORKERS, rewrite=True):
+    os.makedirs(MIRROR_DIR, exist_ok=True)
+    if Image is None:
+        print("[WARN] 未安装 Pillow，图片将原样保存，不做缩放")
+    manifest = load_manifest()
+    records = manifest.setdefault("urls", {})
+    urls = collect_urls(base_url)
+    print(f"[INFO] 待镜像图片：{len(urls)} 个")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda u: fetch_logo(u, records.get(u)), urls))
+
+    mapping = {}
+    for url, record in zip(urls, results):
+        if record:
+            records[url] = record
+            mapping[url] = base_url + record["file"]
+    save_manifest(manifest)
+
+    unique = len({r["sha256"] for r in records.values()})
+    print(f"[SUMMARY] 成功 {len(mapping)}/{len(urls)} 个，去重后 {unique} 个文件")
+    if rewrite:
+        # 旧前缀的镜像引用一并改写为当前前缀
+        for ref in collect_refs():
+            file_path = mirrored_file(ref, base_url)
+            if file_path and ref != base_url + file_path:
+                mapping[ref] = base_url + file_path
+        for path in PLAYLISTS:
+            print(f"[SYNC] {path} 改写 tvg-logo：{rewrite_file(path, TVG_LOGO_PATTERN, mapping)} 处")
+        print(f"[SYNC] {APP_FILE} 改写 icon：{rewrite_file(APP_FILE, APP_ICON_PATTERN, mapping)} 处")
+
+    # 清理镜像文件：以列表与 app.json 中实际存在的引用为准，不依赖 manifest 是否完整
+    used = {mirrored_file(ref, base_url) for ref in collect_refs()}
+    used |= {records[url]["file"] for url in urls if url in records}
+    for name in os.listdir(MIRROR_DIR):
+        path = f"{MIRROR_DIR}/{name}"
+        if path not in used:
+            os.remove(path)
+            print(f"[CLEAN] 删除未引用图片：{path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mirror tvg-logo and app icons into the logo directory")
+    parser.add_argument('--base-url', default=BASE_URL, help='Prefix for rewritten logo references')
+    parser.add_argument('--workers', type=int, default=WORKERS, help='Concurrent downloads')
+    parser.add_argument('--no-rewrite', action='store_true', help='Only download, do not rewrite references')
+    args = parser.parse_args()
+    main(base_url=args.base_url, workers=args.workers, rewrite=not args.no_rewrite)
@@ -0,0 +1,121 @@
+import os
+import re
+
+# 播放列表共用的解析工具，供各构建脚本复用
+
+ENCODINGS = ['utf-8', 'gbk', 'gb18030', 'latin-1']
+ATTR_PATTERN = re.compile(r'([\w-]+)\s*=\s*"([^"]*)"')
+HEADER_ATTR_PATTERN = r'({key}\s*=\s*")([^"]*)(")'
+
+
+def read_text_lines(file_path):
+    """按常见编码依次尝试读取文本，全部失败返回 None"""
+    for encoding in ENCODINGS:
+        try:
+            with open(file_path, "r", encoding=encoding) as f:
+                return f.read().splitlines()
+        except UnicodeDecodeError:
+            continue
+        except FileNotFoundError:
+            print(f"[WARN] 文件未找到: {file_path}")
+            return None
+    print(f"[WARN] 文件无法解码: {file_path}")
+    return None
+
+
+def parse_extinf(line):
+    """解析 #EXTINF 行，返回 (属性字典, 频道名)"""
+    head, _, name = line.rpartition(',')
+    if not head:
+        head, name = line, ""
+    return dict(ATTR_PATTERN.findall(head)), name.strip()
+
+
+def parse_m3u_lines(lines):
+    """解析 M3U 文本行，返回频道条目列表
+
+    每个条目为 dict：extinf（原始行）、attrs、name、url、index（#EXTINF 所在行号）、
+    url_index（URL 所在行号）。同一 #EXTINF 下的多个 URL 各自成为一个条目。
+    """
+    entries = []
+    extinf, extinf_index = None, None
+    for i, line in enumerate(lines):
+        line = line.strip()
+        if line.startswith("#EXTINF"):
+            extinf, extinf_index = line, i
+        elif extinf and line and not line.startswith("#"):
+            attrs, name = parse_extinf(extinf)
+            entries.append({
+                "extinf": extinf,
+                "attrs": attrs,
+                "name": name,
+                "url": line,
+                "index": extinf_index,
+                "url_index": i,
+            })
+    return entries
+
+
+def parse_m3u(file_path):
+    lines = read_text_lines(file_path)
+    return parse_m3u_lines(lines) if lines else []
+
+
+def parse_txt_lines(lines):
+    """解析 TXT（name,url + #genre# 分组）文本行，返回 (分组, 频道名, URL) 列表"""
+    entries = []
+    group = ""
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#") or "," not in line:
+            continue
+        name, url = line.split(",", 1)
+        name, url = name.strip(), url.strip()
+        if url == "#genre#":
+            group = name
+            continue
+        if name and url.startswith(("http://", "https://")):
+            entries.append((group, name, url))
+    return entries
+
+
+def parse_txt(file_path):
+    lines = read_text_lines(file_path)
+    return parse_txt_lines(lines) if lines else []
+
+
+def get_header_attr(lines, key):
+    """返回所有 #EXTM3U 头中指定属性的值"""
+    pattern = re.compile(HEADER_ATTR_PATTERN.format(key=re.escape(key)))
+    values = []
+    for line in lines:
+        if line.startswith("#EXTM3U"):
+            m = pattern.search(line)
+            if m:
+                values.append(m.group(2))
+    return values
+
+
+def set_header_attr(lines, key, value):
+    """将所有 #EXTM3U 头中的属性设置为 value（缺失时追加），返回是否有改动"""
+    pattern = re.compile(HEADER_ATTR_PATTERN.format(key=re.escape(key)))
+    changed = False
+    for i, line in enumerate(lines):
+        if not line.startswith("#EXTM3U"):
+            continue
+        if pattern.search(line):
+            new_line = pattern.sub(lambda m: f'{m.group(1)}{value}{m.group(3)}', line, count=1)
+        else:
+            new_line = f'{line.rstrip()} {key}="{value}"'
+        if new_line != line:
+            lines[i] = new_line
+            changed = True
+    return changed
+
+
+def write_text_lines(path, lines):
+    """先写临时文件再替换，避免盒子读到写了一半的列表"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
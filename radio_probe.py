@@ -0,0 +1,236 @@
+import re
+import time
+import argparse
+from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from playlist_utils import parse_txt, write_text_lines
+
+# --- 核心配置 ---
+RADIO_FILE = "radio.txt"
+WORKERS = 16
+TIMEOUT = 8
+# 直连流读取的字节数，足够解析 MPEG 帧头
+SAMPLE_BYTES = 16 * 1024
+# 存活比例低于该值时视为本地网络异常，不改写文件
+MIN_ALIVE_RATIO = 0.3
+# 未带 #genre# 分组的电台按名称关键字归类，按顺序匹配
+GENRE_RULES = [
+    (re.compile(r'交通'), "交通广播"),
+    (re.compile(r'新闻|资讯'), "新闻广播"),
+    (re.compile(r'音乐|MUSIC|动听|飞扬|魅力|流行', re.I), "音乐广播"),
+]
+DEFAULT_GENRE = "综合广播"
+# --- 配置结束 ---
+
+HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"}
+STREAM_INF_PATTERN = re.compile(r'#EXT-X-STREAM-INF:(.*)')
+HLS_ATTR_PATTERN = re.compile(r'([A-Z-]+)=("[^"]*"|[^,]*)')
+EXTINF_PATTERN = re.compile(r'#EXTINF:\s*([\d.]+)')
+
+# MPEG-1 Layer III 比特率表（kbps），下标为帧头中的 bitrate index
+MP3_BITRATES = [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320]
+MP3_BITRATES_V2 = [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160]
+CODEC_BY_TYPE = {
+    "audio/mpeg": "mp3",
+    "audio/mp3": "mp3",
+    "audio/aac": "aac",
+    "audio/aacp": "aac",
+    "audio/x-aac": "aac",
+    "video/mp2t": "ts",
+    "audio/mp4": "aac",
+}
+
+
+def mp3_bitrate(data):
+    """从首个 MPEG 音频帧头解析比特率（kbps），找不到返回 None"""
+    start = 0
+    # 跳过 ID3v2 标签
+    if data[:3] == b"ID3" and len(data) >= 10:
+        start = 10 + ((data[6] & 0x7f) << 21 | (data[7] & 0x7f) << 14 | (data[8] & 0x7f) << 7 | (data[9] & 0x7f))
+    for i in range(start, len(data) - 3):
+        if data[i] != 0xff or (data[i + 1] & 0xe0) != 0xe0:
+            continue
+        version = (data[i + 1] >> 3) & 0x03
+        layer = (data[i + 1] >> 1) & 0x03
+        index = (data[i + 2] >> 4) & 0x0f
+        if layer != 0x01 or version == 0x01 or index in (0, 15):
+            continue
+        return (MP3_BITRATES if version == 0x03 else MP3_BITRATES_V2)[index]
+    return None
+
+
+def codec_of(response, url):
+    content_type = response.headers.get("Content-Type", "").split(";", 1)[0].strip().lower()
+    if content_type in CODEC_BY_TYPE:
+        return CODEC_BY_TYPE[content_type]
+    path = url.split("?", 1)[0].lower()
+    for ext, codec in ((".mp3", "mp3"), (".aac", "aac"), (".ts", "ts"), (".m4a", "aac")):
+        if path.endswith(ext):
+            return codec
+    return content_type or "unknown"
+
+
+def read_sample(response, limit=SAMPLE_BYTES):
+    """读取前 limit 字节，返回 (数据, 收到首个 1KB 数据块的时刻)；与 HLS 分片一样按首块计起播时间"""
+    data = b""
+    first_at = None
+    for chunk in response.iter_content(chunk_size=1024):
+        if first_at is None:
+            first_at = time.monotonic()
+        data += chunk
+        if len(data) >= limit:
+            break
+    return data, first_at
+
+
+def probe_hls(url, text, started, timeout):
+    """解析 m3u8：主列表取第一个码流，媒体列表下载首个分片测量起播时间"""
+    lines = [line.strip() for line in text.splitlines()]
+    bitrate = codec = None
+    for i, line in enumerate(lines):
+        m = STREAM_INF_PATTERN.match(line)
+        if m:
+            attrs = {k: v.strip('"') for k, v in HLS_ATTR_PATTERN.findall(m.group(1))}
+            if attrs.get("BANDWIDTH", "").isdigit():
+                bitrate = int(attrs["BANDWIDTH"]) // 1000
+            codec = attrs.get("CODECS")
+            variant = next((l for l in lines[i + 1:] if l and not l.startswith("#")), None)
+            if not variant:
+                break
+            url = urljoin(url, variant)
+            response = requests.get(url, headers=HEADERS, timeout=timeout)
+            response.raise_for_status()
+            lines = [l.strip() for l in response.text.splitlines()]
+            break
+
+    duration = None
+    segment = None
+    for line in lines:
+        m = EXTINF_PATTERN.match(line)
+        if m:
+            duration = float(m.group(1))
+        elif line and not line.startswith("#") and duration is not None:
+            segment = urljoin(url, line)
+            break
+    if not segment:
+        raise ValueError("m3u8 中没有可用分片")
+
+    with requests.get(segment, headers=HEADERS, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        first = next(response.iter_content(chunk_size=1024), b"")
+        latency = time.monotonic() - started
+        size = len(first) + sum(len(c) for c in response.iter_content(chunk_size=16384))
+        if not bitrate and duration:
+            bitrate = int(size * 8 / duration / 1000)
+        codec = codec or codec_of(response, segment)
+    return {"latency": latency, "codec": codec, "bitrate": bitrate}
+
+
+def probe_stream(url, timeout=TIMEOUT):
+    """探测单个电台：可达性、编码、比特率与起播时间（拿到首个音频字节的耗时）"""
+    started = time.monotonic()
+    try:
+        with requests.get(url, headers=HEADERS, timeout=timeout, stream=True) as response:
+            response.raise_for_status()
+            content_type = response.headers.get("Content-Type", "").lower()
+            if ".m3u8" in url.lower() or "mpegurl" in content_type:
+                text = read_sample(response, 256 * 1024)[0].decode("utf-8", errors="ignore")
+                result = probe_hls(response.url, text, started, timeout)
+            else:
+                sample, first_at = read_sample(response)
+                if not sample:
+                    raise ValueError("未读到任何数据")
+                # 起播时间取首块到达时刻，其余字节只用于解析比特率
+                latency = first_at - started
+                icy_br = response.headers.get("icy-br", "").split(",")[0]
+                bitrate = int(icy_br) if icy_br.isdigit() else mp3_bitrate(sample)
+                result = {"latency": latency, "codec": codec_of(response, url), "bitrate": bitrate}
+        result["ok"] = True
+        return result
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+
+
+def genre_of(group, name):
+    if group:
+        return group
+    for pattern, genre in GENRE_RULES:
+        if pattern.search(name):
+            return genre
+    return DEFAULT_GENRE
+
+
+def pick_best(entries, results):
+    """同名电台只保留起播最快的一个，起播时间相近（0.2 秒内）时取比特率更高者"""
+    best = {}
+    order = []
+    for (group, name, url), result in zip(entries, results):
+        if not result["ok"]:
+            print(f"[DEAD] {name} {url} → {result['error']}")
+            continue
+        key = name.strip()
+        current = best.get(key)
+        if current is None:
+            order.append(key)
+            best[key] = (group, name, url, result)
+            continue
+        cur = current[3]
+        faster = result["latency"] < cur["latency"] - 0.2
+        similar = abs(result["latency"] - cur["latency"]) <= 0.2
+        if faster or (similar and (result["bitrate"] or 0) > (cur["bitrate"] or 0)):
+            print(f"[DEDUP] {name}：{current[2]} → {url}")
+            best[key] = (current[0] or group, name, url, result)
+        else:
+            print(f"[DEDUP] {name}：保留 {current[2]}，丢弃 {url}")
+    return [best[k] for k in order]
+
+
+def build_lines(kept):
+    groups = {}
+    for group, name, url, _ in kept:
+        groups.setdefault(genre_of(group, name), []).append(f"{name},{url}")
+    lines = []
+    for genre, items in groups.items():
+        if lines:
+            lines.append("")
+        lines.append(f"{genre},#genre#")
+        lines += items
+    return lines
+
+
+def main(radio_file=RADIO_FILE, output_file=None, workers=WORKERS, timeout=TIMEOUT):
+    entries = parse_txt(radio_file)
+    if not entries:
+        print(f"[WARN] {radio_file} 中没有电台")
+        return False
+    print(f"[INFO] 共 {len(entries)} 个电台，开始并发探测...")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda e: probe_stream(e[2], timeout), entries))
+
+    for (_, name, url), r in zip(entries, results):
+        if r["ok"]:
+            print(f"[PROBE] {name}：{r['codec']} {r['bitrate'] or '?'}kbps 起播 {r['latency']:.2f}s")
+
+    alive = sum(1 for r in results if r["ok"])
+    if alive < len(entries) * MIN_ALIVE_RATIO:
+        print(f"[ERROR] 仅 {alive}/{len(entries)} 个可用，疑似网络异常，不改写 {radio_file}")
+        return False
+
+    kept = pick_best(entries, results)
+    write_text_lines(output_file or radio_file, build_lines(kept))
+    print(f"[SUMMARY] 可用 {alive}/{len(entries)} 个，去重后保留 {len(kept)} 个，已写入 {output_file or radio_file}")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Probe radio streams and rebuild radio.txt")
+    parser.add_argument('--input', default=RADIO_FILE, help='Radio list in name,url format')
+    parser.add_argument('--output', default=None, help='Output path (defaults to rewriting the input)')
+    parser.add_argument('--workers', type=int, default=WORKERS, help='Concurrent probes')
+    parser.add_argument('--timeout', type=float, default=TIMEOUT, help='Per-request timeout in seconds')
+    args = parser.parse_args()
+    ok = main(radio_file=args.input, output_file=args.output, workers=args.workers, timeout=args.timeout)
+    exit(0 if ok else 1)
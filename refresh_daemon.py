@@ -0,0 +1,300 @@
+import os
+import sys
+import json
+import time
+import random
+import fcntl
+import hashlib
+import argparse
+import subprocess
+
+# 本地常驻调度器：把 smart.yml → sync-m3u.yml 的固定时间差改为按依赖关系触发。
+# 上游抓取按新鲜度目标定时检查，下游阶段在输入文件内容变化后立即重跑；
+# 同一轮内每个任务最多执行一次，失败时按带抖动的指数退避重试。
+# 部署本调度器后它取代 smart.yml、sync-m3u.yml 两个定时任务，应删除二者的 schedule（保留手动触发）；
+# signed-refresh.yml 与手动运行仍会推送，发布前先变基到远程最新提交。
+
+# --- 核心配置 ---
+STATE_DIR = ".refresh"
+STATE_FILE = os.path.join(STATE_DIR, "state.json")
+LOCK_FILE = os.path.join(STATE_DIR, "daemon.lock")
+SMART_URL = "https://raw.githubusercontent.com/judy-gotv/iptv/refs/heads/main/smart.m3u"
+# 与 sync-m3u.yml 相同的上游地址（Secrets 中的 M3U_SOURCE_URL）
+IPTV_URL = os.environ.get("M3U_URL", "")
+# 主循环检查间隔（秒），只做文件哈希比较，开销很小
+TICK_SECONDS = 30
+# 失败退避：BACKOFF_BASE * 2^(失败次数-1)，上限 BACKOFF_MAX，再乘以 0.5~1.5 的随机抖动
+BACKOFF_BASE = 60
+BACKOFF_MAX = 3600
+JOB_TIMEOUT = 900
+# 发布时提交的产物
+PUBLISH_PATHS = ["li.m3u", "1.m3u", "epg.xml.gz", "app.json", "logo"]
+# --- 配置结束 ---
+
+HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"}
+
+
+class Job:
+    """DAG 中的一个任务
+
+    inputs: 内容变化即触发重跑的文件；after: 上游任务名（决定执行顺序，上游本轮失败时跳过）；
+    freshness: 距上次成功超过该秒数也要重跑（用于抓取上游、EPG 等定期更新的数据）。
+    run 返回 True/False 表示成功与否。
+    """
+
+    def __init__(self, name, run, inputs=(), after=(), freshness=None):
+        self.name = name
+        self.run = run
+        self.inputs = list(inputs)
+        self.after = list(after)
+        self.freshness = freshness
+
+
+def file_hash(path):
+    if os.path.isdir(path):
+        digest = hashlib.sha256()
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                digest.update(os.path.relpath(os.path.join(root, name), path).encode("utf-8"))
+                digest.update(file_hash(os.path.join(root, name)).encode("ascii"))
+        return digest.hexdigest()
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return ""
+
+
+def load_state(path=STATE_FILE):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_state(state, path=STATE_FILE):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def backoff_delay(failures, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    return min(cap, base * 2 ** (failures - 1)) * random.uniform(0.5, 1.5)
+
+
+def fetch(url, save_path, record):
+    """条件请求下载上游文件，内容不变时不改写（下游据此判断无需重跑）"""
+    import requests
+
+    headers = dict(HEADERS)
+    # 本地文件缺失时不能用条件请求，否则 304 空响应无法恢复文件
+    if os.path.exists(save_path):
+        if record.get("etag"):
+            headers["If-None-Match"] = record["etag"]
+        if record.get("last_modified"):
+            headers["If-Modified-Since"] = record["last_modified"]
+    response = requests.get(url, headers=headers, timeout=30)
+    if response.status_code == 304 and os.path.exists(save_path):
+        print(f"[FETCH] {url} 未变化（304）")
+        return True
+    response.raise_for_status()
+    if not response.content.strip():
+        raise ValueError("上游返回空内容")
+    record["etag"] = response.headers.get("ETag")
+    record["last_modified"] = response.headers.get("Last-Modified")
+    if file_hash(save_path) == hashlib.sha256(response.content).hexdigest():
+        print(f"[FETCH] {url} 内容未变化")
+        return True
+    tmp_path = f"{save_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(response.content)
+    os.replace(tmp_path, save_path)
+    print(f"[FETCH] {url} 已更新 → {save_path}")
+    return True
+
+
+def run_script(*args):
+    """在子进程中运行仓库脚本，与工作流中的调用方式一致"""
+    proc = subprocess.run([sys.executable, *args], capture_output=True, text=True, timeout=JOB_TIMEOUT)
+    for line in (proc.stdout + proc.stderr).strip().splitlines()[-5:]:
+        print(f"        {line}")
+    return proc.returncode == 0
+
+
+def snapshot(path, save_path):
+    """保存文件副本；后续阶段读取副本，不受台标镜像、EPG 对原文件的改写影响"""
+    tmp_path = f"{save_path}.tmp"
+    with open(path, "rb") as src, open(tmp_path, "wb") as dst:
+        dst.write(src.read())
+    os.replace(tmp_path, save_path)
+    return True
+
+
+def publish(paths=PUBLISH_PATHS):
+    """提交并推送产物，与工作流的提交步骤一致；推送前变基到远程最新提交
+
+    远程在此期间有其他推送（手动运行的工作流、signed-refresh.yml）时，产物冲突以本地新生成的为准；
+    上次推送失败留下的本地提交也会在这里一并推送。
+    """
+    existing = [p for p in paths if os.path.exists(p)]
+    subprocess.run(["git", "add", *existing], check=True)
+    if subprocess.run(["git", "diff", "--cached", "--quiet"]).returncode != 0:
+        subprocess.run(["git", "commit", "-m", "Update li.m3u"], check=True)
+    # rebase 时 theirs 指正在重放的本地提交
+    if subprocess.run(["git", "pull", "--rebase", "--autostash", "-X", "theirs"]).returncode != 0:
+        subprocess.run(["git", "rebase", "--abort"])
+        print("[PUBLISH] 变基到远程失败")
+        return False
+    ahead = subprocess.run(["git", "rev-list", "--count", "@{upstream}..HEAD"],
+                           capture_output=True, text=True, check=True).stdout.strip()
+    if ahead == "0":
+        print("[PUBLISH] 无变化")
+        return True
+    return subprocess.run(["git", "push"]).returncode == 0
+
+
+def build_jobs(state, iptv_url=IPTV_URL, publish_changes=False):
+    smart_file = os.path.join(STATE_DIR, "smart.m3u")
+    iptv_file = os.path.join(STATE_DIR, "iptv.m3u")
+    # smart_m3u 生成后的 1.m3u 副本：logo_mirror/epg_trim 会改写 1.m3u 的台标与 x-tvg-url，
+    # 下游以副本为输入，避免这些改写触发 sync_li 重跑并把上游 x-tvg-url 写回 li.m3u
+    extra_file = os.path.join(STATE_DIR, "1.m3u")
+    record = lambda name: state.setdefault(name, {})
+    jobs = [
+        Job("fetch_smart", lambda: fetch(SMART_URL, smart_file, record("fetch_smart")), freshness=30 * 60),
+        Job("smart", lambda: run_script("smart_m3u.py", "--source", smart_file, "--output", "1.m3u")
+            and snapshot("1.m3u", extra_file), inputs=[smart_file], after=["fetch_smart"]),
+    ]
+    if iptv_url:
+        jobs += [
+            Job("fetch_iptv", lambda: fetch(iptv_url, iptv_file, record("fetch_iptv")), freshness=30 * 60),
+            Job("sync_li", lambda: run_script("sync_li.py", "--source", iptv_file, "--output", "li.m3u", "--extra", extra_file),
+                inputs=[iptv_file, extra_file], after=["fetch_iptv", "smart"]),
+        ]
+    else:
+        print("[WARN] 未设置 M3U_URL，跳过 li.m3u 整表生成，仅刷新 1.m3u 与签名地址")
+    upstream = ["sync_li"] if iptv_url else ["smart"]
+    channel_inputs = [iptv_file, extra_file] if iptv_url else [extra_file]
+    jobs += [
+        # 频道集合只由上游列表决定，签名刷新、台标与 EPG 改写 li.m3u/1.m3u 不会触发任何任务重跑
+        Job("logo_mirror", lambda: run_script("logo_mirror.py"), inputs=channel_inputs + ["app.json"], after=upstream),
+        Job("epg_trim", lambda: run_script("epg_trim.py"), inputs=channel_inputs, after=upstream + ["logo_mirror"],
+            freshness=6 * 3600),
+        # 不依赖上游抓取成功：上游故障时仍要保持签名地址可用，列表顺序保证其在 sync_li 之后执行
+        Job("signed_refresh", lambda: run_script("signed_refresh.py"), freshness=10 * 60),
+    ]
+    if publish_changes:
+        # 放在最后执行，个别任务失败时仍发布其余已更新的产物
+        jobs.append(Job("publish", publish, inputs=PUBLISH_PATHS))
+    return jobs
+
+
+def topo_order(jobs):
+    by_name = {job.name: job for job in jobs}
+    ordered, visiting, done = [], set(), set()
+
+    def visit(job):
+        if job.name in done:
+            return
+        if job.name in visiting:
+            raise ValueError(f"任务依赖成环：{job.name}")
+        visiting.add(job.name)
+        for name in job.after:
+            if name in by_name:
+                visit(by_name[name])
+        visiting.discard(job.name)
+        done.add(job.name)
+        ordered.append(job)
+
+    for job in jobs:
+        visit(job)
+    return ordered
+
+
+def due_reason(job, record, now):
+    """返回任务需要执行的原因，无需执行返回 None"""
+    if now < record.get("next_attempt", 0):
+        return None
+    if record.get("failures"):
+        return "重试"
+    if not record.get("last_ok"):
+        return "首次运行"
+    if job.freshness and now - record["last_ok"] >= job.freshness:
+        return "超过新鲜度目标"
+    seen = record.get("seen", {})
+    changed = [p for p in job.inputs if file_hash(p) != seen.get(p)]
+    if changed:
+        return f"输入变化：{', '.join(changed)}"
+    return None
+
+
+def tick(jobs, state):
+    """按拓扑顺序执行一轮；同一轮内每个任务最多执行一次，上游失败的任务本轮跳过"""
+    failed = set()
+    ran = 0
+    for job in topo_order(jobs):
+        record = state.setdefault(job.name, {})
+        if any(name in failed for name in job.after):
+            failed.add(job.name)
+            continue
+        now = time.time()
+        reason = due_reason(job, record, now)
+        if not reason:
+            continue
+        print(f"[RUN] {job.name}（{reason}）")
+        started = time.monotonic()
+        try:
+            ok = job.run()
+        except Exception as e:
+            print(f"[ERROR] {job.name} → {str(e)}")
+            ok = False
+        record["last_run"] = now
+        ran += 1
+        if ok:
+            record["last_ok"] = now
+            record["failures"] = 0
+            record["next_attempt"] = 0
+            # 在本任务执行后记录输入哈希，任务改写自身输入时不会再次触发
+            record["seen"] = {p: file_hash(p) for p in job.inputs}
+            print(f"[DONE] {job.name} 用时 {time.monotonic() - started:.1f}s")
+        else:
+            record["failures"] = record.get("failures", 0) + 1
+            delay = backoff_delay(record["failures"])
+            record["next_attempt"] = now + delay
+            failed.add(job.name)
+            print(f"[FAIL] {job.name} 第 {record['failures']} 次失败，{delay:.0f}s 后重试")
+        save_state(state)
+    return ran
+
+
+def main(once=False, tick_seconds=TICK_SECONDS, iptv_url=IPTV_URL, publish_changes=False):
+    os.makedirs(STATE_DIR, exist_ok=True)
+    # 同一仓库只允许一个调度器实例，避免重复运行相同任务
+    lock = open(LOCK_FILE, "w")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        print("[ERROR] 已有调度器在运行")
+        return False
+    state = load_state()
+    jobs = build_jobs(state, iptv_url, publish_changes)
+    print(f"[INFO] 任务顺序：{' → '.join(job.name for job in topo_order(jobs))}")
+    while True:
+        tick(jobs, state)
+        if once:
+            return True
+        time.sleep(tick_seconds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the playlist pipeline as a dependency-aware refresh daemon")
+    parser.add_argument('--once', action='store_true', help='Run a single round and exit')
+    parser.add_argument('--tick', type=int, default=TICK_SECONDS, help='Seconds between rounds')
+    parser.add_argument('--source', default=IPTV_URL, help='Upstream M3U for li.m3u (default: $M3U_URL)')
+    parser.add_argument('--publish', action='store_true', help='Commit and push changed outputs after each round')
+    args = parser.parse_args()
+    ok = main(once=args.once, tick_seconds=args.tick, iptv_url=args.source, publish_changes=args.publish)
+    exit(0 if ok else 1)
@@ -0,0 +1,189 @@
+import os
+import json
+import time
+import argparse
+from urllib.parse import urlsplit, parse_qs
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from playlist_utils import read_text_lines, parse_m3u_lines, write_text_lines
+
+# --- 核心配置 ---
+LIVE_FILE = "li.m3u"
+STATE_FILE = "signed_state.json"
+# 与 sync-m3u.yml 相同的上游地址（Secrets 中的 M3U_SOURCE_URL）
+SOURCE_URL = os.environ.get("M3U_URL", "")
+# 出现这些参数的 URL 视为带签名、会过期
+SIGN_PARAMS = ("sign", "auth_token", "token", "wsSecret", "txSecret", "key", "auth_key")
+# 这些参数若是 Unix 时间戳，则视为过期时间
+EXPIRY_PARAMS = ("expires", "expire", "wsTime", "txTime", "e")
+# 距离过期不足该秒数时提前刷新
+EXPIRY_MARGIN = 600
+WORKERS = 16
+TIMEOUT = 6
+# --- 配置结束 ---
+
+HEADERS = {"User-Agent": "okHttp/Mod-1.5.0.0"}
+
+
+def is_signed(url):
+    query = parse_qs(urlsplit(url).query)
+    return any(p in query for p in SIGN_PARAMS)
+
+
+def expiry_of(url):
+    """从 URL 参数中读出过期时间戳（十进制或十六进制），没有则返回 None"""
+    query = parse_qs(urlsplit(url).query)
+    for param in EXPIRY_PARAMS:
+        for value in query.get(param, []):
+            # 纯数字按十进制，含字母时按十六进制（如 wsTime/txTime）
+            try:
+                ts = int(value, 10 if value.isdigit() else 16)
+            except ValueError:
+                continue
+            if 1_000_000_000 < ts < 10_000_000_000:
+                return ts
+    return None
+
+
+def channel_key(entry):
+    name = entry["attrs"].get("tvg-name") or entry["name"]
+    return f'{entry["attrs"].get("group-title", "")}/{name}'
+
+
+def channel_keys(entries):
+    """为每个条目生成唯一标识：同一频道的多个地址按出现顺序编号（分组/频道名#序号）"""
+    seen = {}
+    keys = []
+    for entry in entries:
+        key = channel_key(entry)
+        n = seen.get(key, 0)
+        seen[key] = n + 1
+        keys.append(f"{key}#{n}" if n else key)
+    return keys
+
+
+def load_state(path=STATE_FILE):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_state(state, path=STATE_FILE):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def probe(url, timeout=TIMEOUT):
+    """只读取 m3u8 开头几 KB，能拿到 #EXTM3U 即视为签名仍有效"""
+    try:
+        with requests.get(url, headers=HEADERS, timeout=timeout, stream=True) as response:
+            if response.status_code != 200:
+                return False
+            head = next(response.iter_content(chunk_size=4096), b"")
+            return head.lstrip().startswith(b"#EXTM3U")
+    except Exception:
+        return False
+
+
+def fetch_source(url):
+    """重新拉取上游列表，返回 {频道标识: 新 URL}"""
+    response = requests.get(url, headers=HEADERS, timeout=30)
+    response.raise_for_status()
+    response.encoding = response.encoding or "utf-8"
+    entries = parse_m3u_lines(response.text.splitlines())
+    return dict(zip(channel_keys(entries), (e["url"] for e in entries)))
+
+
+def check_once(live_file=LIVE_FILE, source_url=SOURCE_URL, workers=WORKERS):
+    """探测一轮签名地址，只替换失效的频道，返回替换个数"""
+    lines = read_text_lines(live_file)
+    if not lines:
+        return 0
+    state = load_state()
+    now = int(time.time())
+    entries = parse_m3u_lines(lines)
+    # 序号按全部条目计算，与上游列表中的同名地址一一对应
+    for entry, key in zip(entries, channel_keys(entries)):
+        entry["key"] = key
+    signed = [e for e in entries if is_signed(e["url"])]
+
+    for entry in signed:
+        record = state.get(entry["key"])
+        if not record or record.get("url") != entry["url"]:
+            # 新出现或被整表重建替换过的地址，从现在起计签发时间
+            state[entry["key"]] = {"url": entry["url"], "issued": now, "validated": 0, "failures": 0}
+
+    def needs_refresh(entry):
+        expiry = expiry_of(entry["url"])
+        if expiry is not None and expiry - now < EXPIRY_MARGIN:
+            return True
+        return not probe(entry["url"])
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        expired_flags = list(pool.map(needs_refresh, signed))
+
+    expired = []
+    for entry, is_expired in zip(signed, expired_flags):
+        record = state[entry["key"]]
+        if is_expired:
+            record["failures"] += 1
+            expired.append(entry)
+        else:
+            record["validated"] = now
+            record["failures"] = 0
+    print(f"[PROBE] 签名地址 {len(signed)} 个，失效 {len(expired)} 个")
+
+    patched = 0
+    if expired:
+        if not source_url:
+            print("[WARN] 未设置 M3U_URL，无法刷新失效频道")
+        else:
+            try:
+                fresh = fetch_source(source_url)
+            except Exception as e:
+                print(f"[下载] 失败：上游列表 → {str(e)}")
+                fresh = {}
+            for entry in expired:
+                key = entry["key"]
+                new_url = fresh.get(key)
+                if not new_url or new_url == entry["url"]:
+                    print(f"[SKIP] {key} 上游暂无新地址")
+                    continue
+                lines[entry["url_index"]] = new_url
+                state[key] = {"url": new_url, "issued": now, "validated": now, "failures": 0}
+                patched += 1
+                print(f"[SYNC] 已刷新 {key}")
+            if patched:
+                write_text_lines(live_file, lines)
+
+    # 清理已不在列表中的频道
+    current = {e["key"] for e in signed}
+    for key in list(state):
+        if key not in current:
+            state.pop(key)
+    save_state(state)
+    return patched
+
+
+def main(interval=0, live_file=LIVE_FILE, source_url=SOURCE_URL):
+    while True:
+        patched = check_once(live_file, source_url)
+        print(f"[SUMMARY] 本轮刷新 {patched} 个频道")
+        if not interval:
+            return patched
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Probe signed live URLs and patch only the expired channels")
+    parser.add_argument('--interval', type=int, default=0, help='Seconds between rounds (0 = run once)')
+    parser.add_argument('--live', default=LIVE_FILE, help='Playlist to check and patch')
+    parser.add_argument('--source', default=SOURCE_URL, help='Upstream M3U to take fresh URLs from (default: $M3U_URL)')
+    args = parser.parse_args()
+    main(interval=args.interval, live_file=args.live, source_url=args.source)
@@ -0,0 +1,93 @@
+import re
+import argparse
+
+# --- 核心配置 ---
+SOURCE_FILE = "/tmp/smart.m3u"
+OUTPUT_FILE = "1.m3u"
+TARGET_GROUP = "GPT-台湾"
+UA_ATTR = 'http-user-agent="Goiptv/8.8.8"'
+# --- 配置结束 ---
+
+
+def strip_group(lines, target_group=TARGET_GROUP):
+    """提取 1.m3u 中所有非目标分组的行"""
+    kept = []
+    i = 0
+    while i < len(lines):
+        if lines[i].startswith("#EXTINF"):
+            match = re.search(r'group-title="([^"]+)"', lines[i])
+            if match and match.group(1) == target_group:
+                j = i + 1
+                while j < len(lines) and lines[j].startswith("#"):
+                    j += 1
+                if j < len(lines) and not lines[j].startswith("#"):
+                    j += 1
+                i = j
+                continue
+        kept.append(lines[i])
+        i += 1
+    return kept
+
+
+def extract_group(src_lines, target_group=TARGET_GROUP, ua_attr=UA_ATTR):
+    """从源文件提取最新目标分组频道，并注入 User-Agent"""
+    entries = []
+    i = 0
+    while i < len(src_lines):
+        line = src_lines[i].rstrip('\n')
+        if line.startswith("#EXTINF"):
+            match = re.search(r'group-title="([^"]+)"', line)
+            if match and match.group(1) == target_group:
+                j = i + 1
+                url = None
+                while j < len(src_lines):
+                    next_line = src_lines[j].rstrip('\n')
+                    if next_line and not next_line.startswith("#"):
+                        url = next_line
+                        break
+                    j += 1
+                if url is not None:
+                    extinf_clean = re.sub(r'\s*http-user-agent="[^"]*"', '', line)
+                    if ',' in extinf_clean:
+                        pos = extinf_clean.rfind(',')
+                        new_extinf = extinf_clean[:pos] + ' ' + ua_attr + extinf_clean[pos:]
+                    else:
+                        new_extinf = extinf_clean + ' ' + ua_attr
+                    entries.append(new_extinf)
+                    entries.append(url)
+                i = j + 1 if url else i + 1
+            else:
+                i += 1
+        else:
+            i += 1
+    return entries
+
+
+def main(source_file=SOURCE_FILE, output_file=OUTPUT_FILE):
+    try:
+        with open(output_file, "r", encoding="utf-8") as f:
+            non_taiwan_lines = strip_group([line.rstrip('\n') for line in f.readlines()])
+    except FileNotFoundError:
+        non_taiwan_lines = []
+
+    with open(source_file, "r", encoding="utf-8") as f_in:
+        new_taiwan_entries = extract_group(f_in.readlines())
+
+    # 重写 1.m3u = 非台湾内容 + 两空行 + 新台湾频道
+    with open(output_file, "w", encoding="utf-8") as f_out:
+        for line in non_taiwan_lines:
+            f_out.write(line + "\n")
+        # 如果有新台湾频道，加两个空行（视觉分隔）
+        if new_taiwan_entries:
+            f_out.write("\n\n")
+        for entry in new_taiwan_entries:
+            f_out.write(entry + "\n")
+    print(f"[INFO] {TARGET_GROUP} 频道 {len(new_taiwan_entries) // 2} 个，已写入 {output_file}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh the GPT-台湾 group of 1.m3u from smart.m3u")
+    parser.add_argument('--source', default=SOURCE_FILE, help='Downloaded smart.m3u')
+    parser.add_argument('--output', default=OUTPUT_FILE, help='Playlist to update')
+    args = parser.parse_args()
+    main(source_file=args.source, output_file=args.output)
@@ -0,0 +1,270 @@
+import os
+import sys
+import json
+import time
+import base64
+import argparse
+import threading
+import multiprocessing
+import importlib.util
+from urllib.parse import urlsplit, parse_qsl
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# 局域网爬虫服务：一个进程池加载 Spider，多台盒子共用同一份抓取与解析结果。
+# 接口兼容盒子 type 4（T4）站点的 HTTP 约定，站点写法：
+#   {"key": "hema", "name": "河马短剧", "type": 4, "api": "http://服务器IP:9978/"}
+# 爬虫按客户端状况做的选择（如河马短剧按带宽选清晰度）在服务模式下默认以服务器自身的测速为准；
+# 需要按盒子区分时在地址中加一段 extend 参数，各盒子分别缓存，例如弱 Wi-Fi 盒子：
+#   "api": "http://服务器IP:9978/quality=low/"  或  "http://服务器IP:9978/bandwidth=1500/"
+
+# --- 核心配置 ---
+SPIDER_FILE = "河马短剧.py"
+HOST = "0.0.0.0"
+PORT = 9978
+WORKERS = os.cpu_count() or 2
+CALL_TIMEOUT = 30
+# 各接口结果缓存时间（秒）；播放地址带签名，只短暂缓存
+CACHE_TTL = {
+    "home": 3600,
+    "category": 600,
+    "detail": 1800,
+    "search": 300,
+    "play": 60,
+}
+CACHE_MAX_ENTRIES = 5000
+# 每个工作进程最多保留的客户端参数（不同参数各用一个 Spider 实例）
+MAX_CLIENT_HINTS = 16
+# --- 配置结束 ---
+
+_spider = None
+_extend = ""
+_spiders = {}  # 客户端参数 -> 按该参数初始化的 Spider 实例
+
+
+def load_spider(path, extend=""):
+    """按文件路径加载爬虫模块并初始化，与盒子宿主加载 type 3 站点的方式一致"""
+    path = os.path.abspath(path)
+    sys.path.insert(0, os.path.dirname(path))
+    spec = importlib.util.spec_from_file_location("spider", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    spider = module.Spider()
+    spider.init(extend)
+    return spider
+
+
+def _init_worker(path, extend):
+    global _spider, _extend
+    _spider = load_spider(path, extend)
+    _extend = extend
+
+
+def merge_extend(extend, hint):
+    """客户端参数（a=1&b=2）覆盖服务启动时的 extend JSON 中的同名字段"""
+    try:
+        base = json.loads(extend) if extend else {}
+    except ValueError:
+        base = {}
+    if not isinstance(base, dict):
+        base = {}
+    base.update(parse_qsl(hint))
+    return json.dumps(base, ensure_ascii=False)
+
+
+def _spider_for(hint):
+    if not hint:
+        return _spider
+    spider = _spiders.get(hint)
+    if spider is None:
+        if len(_spiders) >= MAX_CLIENT_HINTS:
+            _spiders.clear()
+        spider = type(_spider)()
+        spider.init(merge_extend(_extend, hint))
+        _spiders[hint] = spider
+    return spider
+
+
+def _call(method, args, hint=""):
+    """在工作进程中执行 Spider 方法，hint 为客户端参数"""
+    return getattr(_spider_for(hint), method)(*args)
+
+
+def split_hint(path):
+    """拆出路径开头的客户端参数段（含 = 的一段），返回 (规范化参数, 其余路径)"""
+    segments = [s for s in path.split("/") if s]
+    if segments and "=" in segments[0]:
+        hint = "&".join(f"{k}={v}" for k, v in sorted(parse_qsl(segments[0].replace(",", "&"))))
+        return hint, "/" + "/".join(segments[1:])
+    return "", path
+
+
+def decode_ext(ext):
+    """T4 的 ext 为 base64 编码的筛选 JSON，也兼容直接传 JSON"""
+    if not ext:
+        return {}
+    for decode in (lambda s: base64.b64decode(s + "=" * (-len(s) % 4)).decode("utf-8"), lambda s: s):
+        try:
+            value = json.loads(decode(ext))
+            if isinstance(value, dict):
+                return value
+        except Exception:
+            continue
+    return {}
+
+
+class SpiderRuntime:
+    """进程池 + 结果缓存；相同请求在缓存未命中时只派发一次，其余请求等待同一结果"""
+
+    def __init__(self, spider_file=SPIDER_FILE, extend="", workers=WORKERS, timeout=CALL_TIMEOUT, methods=()):
+        self.methods = set(methods)
+        self.pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(spider_file, extend))
+        self.timeout = timeout
+        self.cache = {}    # key -> (过期时间, 结果)
+        self.pending = {}  # key -> AsyncResult
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def call(self, kind, method, *args, hint=""):
+        ttl = CACHE_TTL.get(kind, 0)
+        key = json.dumps([hint, method, args], ensure_ascii=False, sort_keys=True)
+        with self.lock:
+            cached = self.cache.get(key)
+            if cached and cached[0] > time.monotonic():
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+            pending = self.pending.get(key)
+            if pending is None:
+                # 等待超时不撤销派发：结果在工作进程完成时由回调写入缓存并移出 pending，
+                # 超时后的重试继续等待同一任务，而不是再派发一次
+                pending = self.pool.apply_async(_call, (method, args, hint),
+                                                callback=lambda result: self._finish(key, ttl, result),
+                                                error_callback=lambda e: self._finish(key, 0, None))
+                self.pending[key] = pending
+        return pending.get(self.timeout)
+
+    def _finish(self, key, ttl, result):
+        """在结果线程中执行，先于等待者被唤醒；缓存写入与移出 pending 在同一把锁内完成"""
+        with self.lock:
+            self.pending.pop(key, None)
+            # 空结果多为源站临时失败，不缓存
+            if ttl and result and (not isinstance(result, dict) or result.get("list") or result.get("url") or result.get("class")):
+                if len(self.cache) >= CACHE_MAX_ENTRIES:
+                    now = time.monotonic()
+                    self.cache = {k: v for k, v in self.cache.items() if v[0] > now}
+                    if len(self.cache) >= CACHE_MAX_ENTRIES:
+                        self.cache.clear()
+                self.cache[key] = (time.monotonic() + ttl, result)
+
+    def home(self, filter, hint=""):
+        result = dict(self.call("home", "homeContent", filter, hint=hint) or {})
+        # T4 首页同时返回分类与推荐列表
+        if not result.get("list") and "homeVideoContent" in self.methods:
+            videos = self.call("home", "homeVideoContent", hint=hint) or {}
+            result["list"] = videos.get("list", [])
+        return result
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+
+
+class Handler(BaseHTTPRequestHandler):
+    runtime = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status, content_type, body, headers=None):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            if key.lower() not in ("content-length", "content-type", "transfer-encoding", "connection"):
+                self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, obj, status=200):
+        self.send_body(status, "application/json; charset=utf-8", json.dumps(obj, ensure_ascii=False))
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        params = dict(parse_qsl(parts.query, keep_blank_values=True))
+        hint, path = split_hint(parts.path)
+        started = time.monotonic()
+        try:
+            if path.rstrip("/") == "/proxy":
+                self.proxy(params, hint)
+            elif path.rstrip("/") == "/stats":
+                rt = self.runtime
+                self.send_json({"cache": len(rt.cache), "hits": rt.hits, "misses": rt.misses, "pending": len(rt.pending)})
+            else:
+                self.send_json(self.dispatch(params, hint))
+        except multiprocessing.TimeoutError:
+            self.send_json({"error": "爬虫响应超时"}, 504)
+        except Exception as e:
+            print(f"[ERROR] {self.path} → {str(e)}")
+            self.send_json({"error": str(e)}, 500)
+        print(f"[API] {self.path} {(time.monotonic() - started) * 1000:.0f}ms")
+
+    def dispatch(self, params, hint=""):
+        rt = self.runtime
+        flag = lambda name: params.get(name, "").lower() in ("1", "true")
+        if "play" in params:
+            return rt.call("play", "playerContent", params.get("flag", ""), params["play"], [], hint=hint)
+        if params.get("ac") == "detail" and params.get("ids"):
+            return rt.call("detail", "detailContent", params["ids"].split(","), hint=hint)
+        if "wd" in params:
+            return rt.call("search", "searchContent", params["wd"], flag("quick"), params.get("pg", "1"), hint=hint)
+        if "t" in params:
+            return rt.call("category", "categoryContent", params["t"], params.get("pg", "1"),
+                           flag("f"), decode_ext(params.get("ext", "")), hint=hint)
+        return rt.home(flag("filter"), hint)
+
+    def proxy(self, params, hint=""):
+        """转发到 Spider.localProxy，返回 [状态码, 类型, 内容] 或 [状态码, 类型, 头, 内容]，不缓存"""
+        result = self.runtime.pool.apply_async(_call, ("localProxy", (params,), hint)).get(self.runtime.timeout)
+        if len(result) >= 4:
+            status, content_type, headers, body = result[:4]
+        else:
+            status, content_type, body = result
+            headers = {}
+        # 在发出响应头之前确定内容，避免写入非字节内容时响应已发出一半
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body, ensure_ascii=False)
+            content_type = "application/json; charset=utf-8"
+        elif body is not None and not isinstance(body, (bytes, str)):
+            raise TypeError(f"localProxy 返回的内容类型不支持: {type(body).__name__}")
+        self.send_body(int(status), content_type or "application/octet-stream", body or b"", headers)
+
+
+def main(spider_file=SPIDER_FILE, host=HOST, port=PORT, workers=WORKERS, extend=""):
+    spider = load_spider(spider_file, extend)
+    methods = [name for name in dir(spider) if not name.startswith("_")]
+    runtime = SpiderRuntime(spider_file, extend, workers, methods=methods)
+    Handler.runtime = runtime
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    print(f"[INFO] {spider_file}（{spider.getName()}）已启动：http://{host}:{port}/，工作进程 {workers} 个")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        runtime.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a Python spider to many boxes over a T4-style HTTP API")
+    parser.add_argument('--spider', default=SPIDER_FILE, help='Spider file defining class Spider')
+    parser.add_argument('--host', default=HOST, help='Listen address')
+    parser.add_argument('--port', type=int, default=PORT, help='Listen port')
+    parser.add_argument('--workers', type=int, default=WORKERS, help='Worker processes')
+    parser.add_argument('--extend', default="", help='Extend string passed to Spider.init')
+    args = parser.parse_args()
+    main(spider_file=args.spider, host=args.host, port=args.port, workers=args.workers, extend=args.extend)
@@ -2,6 +2,8 @@ import os
 import re
 import argparse
 
+from config_engine import ConfigDocument
+
 FILE1 = "2024.json"
 LIVE_FILE = "li.m3u"
 OK_DIR = "./ok"
@@ -13,8 +15,7 @@ UA_PATTERNS = [
     r'\bUA\b[:：]?\s*([^\s，,]+)',             
 ]
 
-PNG_OLD_PATH_PATTERN = r"\./ok/ok\d{4}\.png"
-UA_VALUE_PATTERN = re.compile(r'("ua"\s*:\s*")([^"]*)(")')  
+PNG_OLD_PATH_PATTERN = re.compile(r"\./ok/ok\d{4}\.png")
 
 def read_file_lines(path):
     if not os.path.exists(path):
@@ -23,10 +24,6 @@ def read_file_lines(path):
     with open(path, "r", encoding="utf-8") as f:
         return f.readlines()
 
-def write_file_lines(path, lines):
-    with open(path, "w", encoding="utf-8") as f:
-        f.writelines(lines)
-
 def extract_ua_from_line(line):
     if not line:
         return None
@@ -36,70 +33,40 @@ def extract_ua_from_line(line):
             return m.group(1).strip()
     return None
 
-def replace_ua_value_in_line6_or_file(path, new_ua):
-    lines = read_file_lines(path)
-    if not lines:
-        return False, None, None
-
-    # 先尝试第6行
-    if len(lines) >= 6:
-        line6 = lines[5]
-        m6 = UA_VALUE_PATTERN.search(line6)
-        if m6:
-            old_val = m6.group(2)
-            if old_val == new_ua:
-                print(f"[INFO] UA 在 {path} 的第6行已与 live.m3u 一致，无需更新")
-                return False, old_val, 'line6'
-            new_line6 = UA_VALUE_PATTERN.sub(rf'\1{new_ua}\3', line6, count=1)
-            if new_line6 != line6:
-                lines[5] = new_line6
-                write_file_lines(path, lines)
-                print(f"[SYNC] 已在 {path} 的第6行更新 UA：{old_val} → {new_ua}")
-                return True, old_val, 'line6'
-            return False, old_val, 'line6'
-        else:
-            print(f"[INFO] {path} 的第6行未包含 ua 字段，改为在整文件内尝试一次替换")
-
-    # 再尝试在整文件中替换首个 ua 值
-    content = "".join(lines)
-    m_any = UA_VALUE_PATTERN.search(content)
-    if m_any:
-        old_val = m_any.group(2)
-        if old_val == new_ua:
-            print(f"[INFO] {path} 文件内首个 UA 已与 live.m3u 一致，无需更新")
-            return False, old_val, 'file'
-        content_new = UA_VALUE_PATTERN.sub(rf'\1{new_ua}\3', content, count=1)
-        if content_new != content:
-            write_file_lines(path, content_new.splitlines(keepends=True))
-            print(f"[SYNC] 已在 {path} 的文件内首个 UA 处更新：{old_val} → {new_ua}")
-            return True, old_val, 'file'
-        return False, old_val, 'file'
-    else:
-        print(f"[WARN] {path} 未发现任何 ua 字段，跳过 UA 替换")
-        return False, None, None
-
-def update_png_path(json_file, latest_png_path):
-    lines = read_file_lines(json_file)
-    if not lines:
+def update_live_ua(doc, new_ua):
+    """更新引用 live.m3u 的直播源 UA"""
+    live_url = f"./{LIVE_FILE}"
+    old_values = doc.values(["lives", {"url": live_url}, "ua"])
+    if old_values and all(v == new_ua for v in old_values):
+        print(f"[INFO] {doc.path} 中 {live_url} 的 UA 已与 live.m3u 一致，无需更新")
         return False
-    content = "".join(lines)
-    if re.search(PNG_OLD_PATH_PATTERN, content):
-        content_new = re.sub(PNG_OLD_PATH_PATTERN, latest_png_path, content)
-        if content_new != content:
-            write_file_lines(json_file, content_new.splitlines(keepends=True))
-            print(f"[SYNC] PNG 路径已更新到 {json_file} -> {latest_png_path}")
-            return True
-        else:
-            print(f"[INFO] {json_file} 中 PNG 路径已是最新")
-            return False
-    else:
-        print(f"[INFO] {json_file} 中未检测到旧 PNG 路径，跳过替换")
+    if not doc.select(["lives", {"url": live_url}]):
+        print(f"[WARN] {doc.path} 未发现 url 为 {live_url} 的直播源，跳过 UA 替换")
+        return False
+    doc.set_live_ua({"url": live_url}, new_ua)
+    old_val = old_values[0] if old_values else None
+    print(f"[SYNC] 已在 {doc.path} 更新 {live_url} 的 UA：{old_val} → {new_ua}")
+    return True
+
+def update_png_path(doc, latest_png_path):
+    """把所有站点中旧的 ./ok/okNNNN.png jar 路径替换为最新文件"""
+    old_jars = {j for j in doc.values(["sites", {}, "jar"]) if isinstance(j, str) and PNG_OLD_PATH_PATTERN.fullmatch(j)}
+    if not old_jars:
+        print(f"[INFO] {doc.path} 中未检测到旧 PNG 路径，跳过替换")
         return False
+    count = sum(doc.set_site_jar({"jar": jar}, latest_png_path) for jar in old_jars if jar != latest_png_path)
+    if count:
+        print(f"[SYNC] PNG 路径已更新到 {doc.path} -> {latest_png_path}（{count} 个站点）")
+        return True
+    print(f"[INFO] {doc.path} 中 PNG 路径已是最新")
+    return False
 
 def main(update_ua=False, update_png=False):
     changed = False
     ua_changed = False
     png_changed = False
+    # 只解析一次 2024.json，全部修改在内存中完成后统一写回
+    doc = ConfigDocument(FILE1)
 
     if update_ua:
         # ---- 读取 live.m3u 第二行并提取 UA ----
@@ -116,11 +83,9 @@ def main(update_ua=False, update_png=False):
             print("[WARN] live.m3u 少于 2 行，跳过 UA 更新")
 
         # ---- 同步 UA（仅 2024.json）----
-        if ua:
-            did, old, scope = replace_ua_value_in_line6_or_file(FILE1, ua)
-            if did:
-                changed = True
-                ua_changed = True
+        if ua and update_live_ua(doc, ua):
+            changed = True
+            ua_changed = True
 
     if update_png:
         # ---- 最新 PNG 文件同步 ----
@@ -133,10 +98,14 @@ def main(update_ua=False, update_png=False):
             latest_png_full = max((os.path.join(OK_DIR, f) for f in png_files), key=os.path.getmtime)
             latest_png_path = latest_png_full.replace("\\", "/")
             print(f"[INFO] 最新 PNG 文件：{latest_png_path}")
-            if update_png_path(FILE1, latest_png_path):
+            if update_png_path(doc, latest_png_path):
                 changed = True
                 png_changed = True
 
+    # ---- 校验并一次性写回 ----
+    if changed:
+        doc.save()
+
     # ---- 总结 ----
     if changed:
         print(f"[SUMMARY] 检测到变化：UA 更新={ua_changed}, PNG 更新={png_changed}")
@@ -0,0 +1,108 @@
+import re
+import sys
+import argparse
+
+# --- 核心配置 ---
+SOURCE_FILE = "iptv.m3u"
+OUTPUT_FILE = "li.m3u"
+EXTRA_FILE = "1.m3u"
+UA_HINT = "##UA-Hint: 请将 User-Agent 设置为 okHttp/Mod-1.5.0.0 ，否则无法观看"
+# --- 配置结束 ---
+
+skip_group = re.compile(r'group-title="(4K频道|熊猫|影视|地方|少儿|教育|其他|体育|印象天下|纪实|综艺|新闻)"')
+skip_name = re.compile(r'(cgtnru-MCP|cgtndoc-MCP|cgtn-MCP|CGTNALBY|cctv16-MST|cctv8k-MCP|CGTN外语纪录|CGTN阿拉伯语|CGTN西班牙语|CGTN法语|CGTN俄语|CGTN|老故事|发现之旅|中学生|四海钓鱼|24小时|最经典|传奇|体坛|精英|cgtnfr|怀旧剧场)')
+
+migu_exclude_name = re.compile(r'(吉林|青海|海南|海峡|中国农林|兵团|河南|陕西|大湾|东南)')
+weishi_mcp_exclude = re.compile(r'(云南|兵团|甘肃|新疆|西藏|海南|青海|内蒙古|山西|陕西|河南)')
+
+
+def is_cctv(extinf): return bool(re.search(r'group-title="[^"]*央视"|CCTV|cctv', extinf))
+def is_weishi(extinf): return bool(re.search(r'group-title="[^"]*卫视"', extinf))
+def is_weishi_mcp(extinf): return bool(re.search(r'-MCP', extinf))
+
+
+def classify(body):
+    """按央视 / MCP 卫视 / 卫视 / 咪咕分组，返回 (cctv, weishi_mcp, weishi, migu)"""
+    weishi, cctv, migu, weishi_mcp = [], [], [], []
+    i, n = 0, len(body)
+    while i < n:
+        if not body[i].startswith("#EXTINF"):
+            i += 1
+            continue
+        extinf = body[i]
+        if skip_group.search(extinf) or skip_name.search(extinf):
+            i += 2
+            continue
+        url = body[i+1] if (i+1 < n and body[i+1].startswith("http")) else None
+        if not url:
+            i += 1
+            continue
+        # 过滤咪咕
+        if (re.search(r'migu', url, re.I) or
+                re.search(r'\bmg\b', url, re.I) or
+                'mgtv.ottiptv.cc' in url.lower()):
+            if not migu_exclude_name.search(extinf):
+                migu += [extinf, url]
+        # MCP 卫视过滤
+        elif is_weishi(extinf) and is_weishi_mcp(extinf):
+            if not weishi_mcp_exclude.search(extinf):
+                weishi_mcp += [extinf, url]
+        # 普通卫视
+        elif is_weishi(extinf):
+            weishi += [extinf, url]
+        # 央视
+        elif is_cctv(extinf):
+            cctv += [extinf, url]
+        # 默认归为卫视
+        else:
+            weishi += [extinf, url]
+        i += 2
+    return cctv, weishi_mcp, weishi, migu
+
+
+def main(source_file=SOURCE_FILE, output_file=OUTPUT_FILE, extra_file=EXTRA_FILE):
+    try:
+        with open(source_file, "r", encoding="utf-8", errors="ignore") as f:
+            lines = f.read().splitlines()
+    except Exception as e:
+        print(f"[ERROR] 读取 {source_file} 失败：", e)
+        return False
+
+    if not lines:
+        print(f"[ERROR] {source_file} 为空")
+        return False
+
+    header0 = lines[0].strip() if lines else "#EXTM3U"
+    header1 = UA_HINT
+    print("[INFO] Header line 1:", header0)
+    print("[INFO] Header line 2:", header1)
+
+    body = lines[2:] if len(lines) > 2 else []
+    cctv, weishi_mcp, weishi, _ = classify(body)
+    print(f"[INFO]  央视: {len(cctv)//2}, MCP 卫视: {len(weishi_mcp)//2}, 卫视频道: {len(weishi)//2}")
+
+    out_lines = [header0, header1] + cctv + weishi_mcp + weishi
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.write("\n".join(out_lines) + "\n")
+
+    with open(output_file, "r", encoding="utf-8") as f:
+        print(f"[INFO] {output_file} 前6行：\n" + "".join(f.readlines()[:6]))
+    try:
+        with open(extra_file, "r", encoding="utf-8") as f:
+            dmys_content = f.read()
+            with open(output_file, "a", encoding="utf-8") as li_f:
+                li_f.write(dmys_content)
+                print(f"[INFO] {extra_file} 内容已追加到 {output_file}")
+    except FileNotFoundError:
+        print(f"[ERROR] 未找到 {extra_file} 文件")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Filter the upstream IPTV list into li.m3u and append 1.m3u")
+    parser.add_argument('--source', default=SOURCE_FILE, help='Downloaded upstream M3U')
+    parser.add_argument('--output', default=OUTPUT_FILE, help='Generated playlist')
+    parser.add_argument('--extra', default=EXTRA_FILE, help='Playlist appended after the filtered channels')
+    args = parser.parse_args()
+    if not main(source_file=args.source, output_file=args.output, extra_file=args.extra):
+        sys.exit(1)
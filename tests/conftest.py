@@ -0,0 +1,18 @@
+import os
+import sys
+import importlib.util
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 仓库脚本位于根目录，测试直接按模块名导入
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope="session")
+def hema():
+    """按文件路径加载 河马短剧.py（文件名不是合法模块名）"""
+    spec = importlib.util.spec_from_file_location("hema_spider", os.path.join(ROOT, "河马短剧.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,107 @@
+import json
+
+import pytest
+
+from config_engine import ConfigDocument
+
+
+def test_two_appends_to_same_array_keep_both():
+    doc = ConfigDocument(text='{"a": [1,\n  2]}')
+    doc.append(["a"], 3)
+    doc.append(["a"], 4)
+    assert doc.render() == '{"a": [1,\n  2,\n  3,\n  4]}'
+
+
+def test_appends_to_empty_array():
+    doc = ConfigDocument(text='{"a": []}')
+    doc.append(["a"], 1)
+    doc.append(["a"], {"k": 2})
+    assert doc.data == {"a": [1, {"k": 2}]}
+
+
+def test_two_new_keys_on_same_object():
+    doc = ConfigDocument(text='{"lives": [{"url": "./li.m3u"}]}')
+    doc.set(["lives", 0, "ua"], "okHttp")
+    doc.set(["lives", 0, "epg"], "x")
+    assert doc.data == {"lives": [{"url": "./li.m3u", "ua": "okHttp", "epg": "x"}]}
+
+
+def test_new_keys_on_empty_object_and_resetting_same_key():
+    doc = ConfigDocument(text='{"o": {}}')
+    doc.set(["o", "a"], 1)
+    doc.set(["o", "b"], 2)
+    doc.set(["o", "b"], 3)
+    doc.set(["o", "a"], 4)
+    assert doc.render() == '{"o": {"a": 4, "b": 3}}'
+
+
+def test_enable_two_missing_sites_in_one_batch():
+    text = '{"sites": [\n  {"key": "a", "name": "A", "type": 3, "api": "csp_A"}\n]}'
+    doc = ConfigDocument(text=text)
+    site_b = {"key": "b", "name": "B", "type": 3, "api": "csp_B"}
+    site_c = {"key": "c", "name": "C", "type": 3, "api": "csp_C"}
+    count = doc.apply([
+        {"op": "site_enabled", "match": {"key": "b"}, "value": True, "site": site_b},
+        {"op": "site_enabled", "match": {"key": "c"}, "value": True, "site": site_c},
+        {"op": "site_enabled", "match": {"key": "a"}, "value": False},
+    ])
+    assert count == 3
+    assert [s["key"] for s in doc.validate()["sites"]] == ["b", "c"]
+    json.loads(doc.render())
+
+
+def test_remove_all_items_then_append_and_append_then_remove_all():
+    text = '{"a": [\n  1,\n  2\n]}'
+    doc = ConfigDocument(text=text)
+    doc.append(["a"], 3)
+    doc.remove(["a", 0])
+    doc.remove(["a", 1])
+    assert doc.data == {"a": [3]}
+
+    doc = ConfigDocument(text=text)
+    doc.remove(["a", 0])
+    doc.remove(["a", 1])
+    doc.append(["a"], 3)
+    doc.append(["a"], 4)
+    assert doc.data == {"a": [3, 4]}
+
+
+def test_remove_every_item_leaves_valid_json():
+    doc = ConfigDocument(text='{"a": [{"k": 1}, {"k": 1}]}')
+    assert doc.remove(["a", {"k": 1}]) == 2
+    assert doc.data == {"a": []}
+
+
+def test_edit_inside_replaced_value_raises():
+    doc = ConfigDocument(text='{"lives": [{"url": "./li.m3u", "ua": "a"}]}')
+    doc.set(["lives", 0], {"url": "./li.m3u", "ua": "b"})
+    with pytest.raises(ValueError):
+        doc.set(["lives", 0, "ua"], "z")
+    with pytest.raises(ValueError):
+        doc.set(["lives", 0, "epg"], "x")
+    assert doc.data == {"lives": [{"url": "./li.m3u", "ua": "b"}]}
+
+
+def test_edit_inside_removed_site_raises():
+    text = '{"sites": [{"key": "a", "jar": "x"}, {"key": "b", "jar": "y"}]}'
+    doc = ConfigDocument(text=text)
+    assert doc.set_site_enabled({"key": "a"}, False) == 1
+    with pytest.raises(ValueError):
+        doc.apply([{"op": "site_jar", "match": {"key": "a"}, "value": "j"}])
+    # 先改内层再整体替换或删除仍然允许，外层修改生效
+    doc = ConfigDocument(text=text)
+    doc.set_site_jar({"key": "b"}, "j")
+    assert doc.remove(["sites", {"key": "b"}]) == 1
+    assert doc.data == {"sites": [{"key": "a", "jar": "x"}]}
+
+
+def test_derive_writes_updated_copy_without_touching_source(tmp_path):
+    source = tmp_path / "2024.json"
+    source.write_text('{"lives": [{"url": "./li.m3u", "ua": "a"}],\n "sites": []}', encoding="utf-8")
+    doc = ConfigDocument(str(source))
+    doc.set_live_ua({"url": "./li.m3u"}, "b")
+    derived = tmp_path / "lite.json"
+    doc.derive(str(derived), [{"op": "set", "path": ["lives", 0, "url"], "value": "./1.m3u"}])
+    assert json.loads(derived.read_text(encoding="utf-8")) == {"lives": [{"url": "./1.m3u", "ua": "b"}], "sites": []}
+    assert doc.data["lives"][0]["url"] == "./li.m3u"
+    assert json.loads(source.read_text(encoding="utf-8"))["lives"][0]["ua"] == "a"
@@ -0,0 +1,133 @@
+import time
+import struct
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+ALL = {"mp4": "u-mp4", "mp4720p": "u-720", "vodMp4Url": "u-vod"}
+NO_MP4 = {"mp4720p": "u-720", "vodMp4Url": "u-vod"}
+
+
+RATES = {"mp4": 2500, "mp4720p": 1200, "vodMp4Url": 1200}
+
+
+def spider_with(hema, quality="auto", bandwidth=None, rates=RATES):
+    spider = hema.Spider()
+    spider.quality = quality
+    spider.bandwidthKbps = bandwidth
+    # 视为已测过码率，不发请求
+    spider.renditionKbps = dict(rates)
+    spider.lastRenditionProbe = time.time()
+    return spider
+
+
+def test_ties_follow_renditions_order(hema):
+    assert spider_with(hema).pickRendition(NO_MP4) == "u-720"
+    assert spider_with(hema, "high").pickRendition(NO_MP4) == "u-720"
+    assert spider_with(hema, "low").pickRendition(ALL) == "u-720"
+    assert spider_with(hema, bandwidth=500).pickRendition(ALL) == "u-720"
+
+
+def test_bandwidth_picks_highest_fitting(hema):
+    assert spider_with(hema, bandwidth=5000).pickRendition(ALL) == "u-mp4"
+    assert spider_with(hema, bandwidth=2000).pickRendition(ALL) == "u-720"
+    assert spider_with(hema).pickRendition({"vodMp4Url": "u-vod"}) == "u-vod"
+
+
+def test_unmeasured_rates_keep_site_order(hema):
+    assert spider_with(hema, "low", rates={}).pickRendition(ALL) == "u-mp4"
+    assert spider_with(hema, bandwidth=500, rates={"mp4": 2500}).pickRendition(ALL) == "u-mp4"
+
+
+def mp4_head(seconds, size=64 * 1024):
+    """ftyp + moov/mvhd（version 0，timescale 1000）+ 填充"""
+    mvhd = b"mvhd" + bytes(4) + struct.pack(">IIII", 0, 0, 1000, seconds * 1000)
+    head = b"\0\0\0\x14ftypisom\0\0\0\0isom" + struct.pack(">I", len(mvhd) + 12) + b"moov" + struct.pack(">I", len(mvhd) + 4) + mvhd
+    return head + b"\0" * (size - len(head))
+
+
+class RenditionCdn(BaseHTTPRequestHandler):
+    """60 秒的一集：/large.mp4 15MB（2000kbps），/small.mp4 7.5MB（1000kbps），/tail.mp4 无 mvhd"""
+    sizes = {"/large.mp4": 15_000_000, "/small.mp4": 7_500_000, "/tail.mp4": 3_750_000}
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        total = self.sizes[self.path]
+        body = mp4_head(60) if self.path != "/tail.mp4" else b"\0" * (64 * 1024)
+        self.send_response(206)
+        self.send_header("Content-Range", f"bytes 0-{len(body) - 1}/{total}")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def test_rates_are_measured_not_assumed(hema):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RenditionCdn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    # mp4 字段实际是较小的文件：低码率选择必须跟随实测而不是字段名
+    video = {"mp4": f"{base}/small.mp4", "mp4720p": f"{base}/large.mp4", "vodMp4Url": f"{base}/tail.mp4"}
+    try:
+        spider = hema.Spider()
+        spider.quality = "low"
+        assert spider.pickRendition(video) == f"{base}/tail.mp4"
+        assert round(spider.renditionKbps["mp4"]) == 1000
+        assert round(spider.renditionKbps["mp4720p"]) == 2000
+        # 无 mvhd 的文件借用同一集其他清晰度的时长
+        assert round(spider.renditionKbps["vodMp4Url"]) == 500
+        spider.quality = "high"
+        assert spider.pickRendition(video) == f"{base}/large.mp4"
+        spider.quality, spider.bandwidthKbps = "auto", 2000
+        assert spider.pickRendition(video) == f"{base}/small.mp4"
+    finally:
+        server.shutdown()
+
+
+class BigPage(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        body = b"x" * (256 * 1024)
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def test_page_downloads_do_not_feed_throughput(hema):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), BigPage)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        spider = hema.Spider()
+        assert spider.fetch(f"http://127.0.0.1:{server.server_address[1]}/page") is not None
+        assert spider.throughputKbps is None
+    finally:
+        server.shutdown()
+
+
+class SlowStartCdn(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(1.0)  # 首字节等待
+        body = b"v" * (512 * 1024)
+        self.send_response(206)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def test_cdn_probe_excludes_time_to_first_byte(hema):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowStartCdn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        spider = hema.Spider()
+        spider.probeBandwidth(f"http://127.0.0.1:{server.server_address[1]}/v.mp4")
+        # 本地传输 256KB 远快于 1 秒；若把首字节等待计入，结果会低于 2100kbps
+        assert spider.throughputKbps and spider.throughputKbps > 10000
+    finally:
+        server.shutdown()
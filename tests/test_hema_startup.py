@@ -0,0 +1,21 @@
+import os
+import sys
+import subprocess
+
+from conftest import ROOT
+
+# -S 跳过 site，避免环境自带的启动脚本预先导入这些模块
+PROBE = r'''
+import sys, importlib.util
+spec = importlib.util.spec_from_file_location("hema", sys.argv[1])
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+module.Spider().homeContent(False)
+print(",".join(m for m in ("requests", "tempfile", "random", "shutil") if m in sys.modules))
+'''
+
+
+def test_loading_spider_does_not_import_heavy_modules():
+    proc = subprocess.run([sys.executable, "-S", "-c", PROBE, os.path.join(ROOT, "河马短剧.py")],
+                          capture_output=True, text=True, check=True)
+    assert proc.stdout.strip() == ""
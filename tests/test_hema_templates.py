@@ -0,0 +1,82 @@
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+
+def drama_page(chapters):
+    data = {"props": {"pageProps": {"bookInfoVo": {"title": "T", "totalChapterNum": len(chapters)},
+                                    "chapterList": chapters}}}
+    return ('<script id="__NEXT_DATA__" type="application/json">%s</script>' % json.dumps(data)).encode("utf-8")
+
+
+class Origin(BaseHTTPRequestHandler):
+    chapters = []
+    hits = {}
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        with Origin.lock:
+            Origin.hits[self.path] = Origin.hits.get(self.path, 0) + 1
+        if self.path.startswith("/drama/"):
+            body, status, ctype = drama_page(Origin.chapters), 200, "text/html"
+        elif self.path.startswith("/episode/"):
+            chapter = self.path.rsplit("/", 1)[1]
+            body, status, ctype = f'<video src="http://cdn.test/real/{chapter}.mp4">'.encode(), 200, "text/html"
+        else:
+            body, status, ctype = b"missing", 404, "text/html"
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def origin(hema, tmp_path, monkeypatch):
+    monkeypatch.setattr(hema, "TEMPLATE_FILE", str(tmp_path / "templates.json"))
+    Origin.hits = {}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Origin)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    spider = hema.Spider()
+    spider.siteUrl = f"http://127.0.0.1:{server.server_address[1]}"
+    yield spider
+    server.shutdown()
+
+
+def template_probes():
+    return sum(n for path, n in Origin.hits.items() if path.startswith("/bad/"))
+
+
+def test_stale_templates_cost_at_most_two_probes(origin, hema):
+    Origin.chapters = [{"chapterId": "c1", "chapterName": "1"}, {"chapterId": "c2", "chapterName": "2"}]
+    # 20 个从未在本源上成功过的模板（例如地址中含有其它令牌）
+    origin.templates = {f"{origin.siteUrl}/bad/{i}/{{chapter_id}}.mp4": {"hits": 1, "fails": 0}
+                        for i in range(hema.MAX_TEMPLATES)}
+    result = origin.detailContent(["42"])
+    assert template_probes() <= hema.MAX_TEMPLATE_TRIES
+    assert Origin.hits.get("/episode/42/c1") == 1
+    assert "http://cdn.test/real/c2.mp4" in result["list"][0]["vod_play_url"]
+
+    # 下一部剧同样受限，且失败过的模板不再被重复抽查
+    Origin.hits = {}
+    origin.detailContent(["43"])
+    assert template_probes() <= hema.MAX_TEMPLATE_TRIES
+    assert all(s["fails"] <= 1 for t, s in origin.templates.items() if "/bad/" in t)
+
+
+def test_chapter_video_is_used_before_any_probe(origin):
+    Origin.chapters = [
+        {"chapterId": "c1", "chapterName": "1", "chapterVideoVo": {"mp4": "http://cdn.test/vo/c1.mp4"}},
+        {"chapterId": "c2", "chapterName": "2", "chapterVideoVo": {"mp4": "http://cdn.test/vo/c2.mp4"}},
+    ]
+    origin.templates = {f"{origin.siteUrl}/bad/{{chapter_id}}.mp4": {"hits": 5, "fails": 0}}
+    origin.quality = "high"
+    result = origin.detailContent(["42"])
+    assert template_probes() == 0
+    assert not any(path.startswith("/episode/") for path in Origin.hits)
+    assert result["list"][0]["vod_play_url"] == "1$http://cdn.test/vo/c1.mp4#2$http://cdn.test/vo/c2.mp4"
@@ -0,0 +1,23 @@
+import os
+
+import logo_mirror
+
+SELF_ICON = "https://ghfast.top/github.com/klcb2010/TX/raw/master/logo/apklogo.png"
+APP = '[\r\n{"name": "TV", "icon": "%s"}\r\n]\r\n' % SELF_ICON
+
+
+def test_self_hosted_icons_untouched_and_proxied_mirror_refs_made_relative(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("logo/tv")
+    (tmp_path / "logo" / "apklogo.png").write_bytes(b"\x89PNG\r\n\x1a\nicon")
+    (tmp_path / "logo" / "tv" / "0123456789abcdef.png").write_bytes(b"\x89PNG\r\n\x1a\nlogo")
+    (tmp_path / "app.json").write_text(APP, encoding="utf-8", newline="")
+    proxied = "https://ghfast.top/github.com/klcb2010/TX/raw/master/logo/tv/0123456789abcdef.png"
+    (tmp_path / "li.m3u").write_text(f'#EXTM3U\n#EXTINF:-1 tvg-logo="{proxied}",CCTV1\nhttp://a/1\n', encoding="utf-8")
+
+    logo_mirror.main()
+
+    assert (tmp_path / "app.json").read_bytes().decode("utf-8") == APP
+    assert 'tvg-logo="./logo/tv/0123456789abcdef.png"' in (tmp_path / "li.m3u").read_text(encoding="utf-8")
+    # 本仓库托管的图标不再复制进 logo/tv
+    assert os.listdir("logo/tv") == ["0123456789abcdef.png"]
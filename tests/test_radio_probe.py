@@ -0,0 +1,34 @@
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import radio_probe
+
+# 64kbps MPEG-1 Layer III 帧头 + 填充，每 0.125 秒发送 1KB，即实时码率
+FRAME = bytes([0xff, 0xfb, 0x50, 0xc4]) + b"\0" * 1020
+
+
+class PacedMp3(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/mpeg")
+        self.end_headers()
+        for _ in range(16):
+            self.wfile.write(FRAME)
+            self.wfile.flush()
+            time.sleep(0.125)
+
+
+def test_direct_stream_latency_is_time_to_first_chunk():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PacedMp3)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        result = radio_probe.probe_stream(f"http://127.0.0.1:{server.server_address[1]}/a.mp3")
+    finally:
+        server.shutdown()
+    assert result["ok"] and result["bitrate"] == 64
+    # 读满 16KB 采样需要约 2 秒，起播时间只应计到首块
+    assert result["latency"] < 0.5
@@ -0,0 +1,142 @@
+import os
+import threading
+import subprocess
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import refresh_daemon
+import smart_m3u
+import sync_li
+from playlist_utils import read_text_lines, set_header_attr, write_text_lines
+
+SMART = """#EXTM3U
+#EXTINF:-1 tvg-name="台视" tvg-logo="http://logo.example/ttv.png" group-title="GPT-台湾",台视
+http://tw.example/ttv.m3u8
+"""
+IPTV = """#EXTM3U x-tvg-url="http://upstream.example/epg.xml"
+#EXTINF:-1 tvg-name="CCTV1" tvg-logo="http://logo.example/cctv1.png" group-title="央视",CCTV1
+http://cn.example/cctv1.m3u8
+"""
+EPG_URL = "https://mirror.example/epg.xml.gz"
+
+
+def rewrite(path, fix):
+    lines = read_text_lines(path)
+    if lines and fix(lines):
+        write_text_lines(path, lines)
+
+
+def mirror_logos(lines):
+    fixed = [line.replace("http://logo.example/", "./logo/") for line in lines]
+    changed = fixed != lines
+    lines[:] = fixed
+    return changed
+
+
+def fake_run_script(script, *args):
+    """smart_m3u/sync_li 调用真实实现；台标镜像与 EPG 只模拟其对播放列表的改写"""
+    opts = dict(zip(args[::2], args[1::2]))
+    if script == "smart_m3u.py":
+        smart_m3u.main(opts["--source"], opts["--output"])
+    elif script == "sync_li.py":
+        return sync_li.main(opts["--source"], opts["--output"], opts["--extra"])
+    elif script == "logo_mirror.py":
+        for path in ("li.m3u", "1.m3u"):
+            rewrite(path, mirror_logos)
+    elif script == "epg_trim.py":
+        for path in ("li.m3u", "1.m3u"):
+            rewrite(path, lambda lines: set_header_attr(lines, "x-tvg-url", EPG_URL))
+    elif script == "signed_refresh.py":
+        pass
+    return True
+
+
+def fake_fetch(url, save_path, record):
+    content = SMART if url == refresh_daemon.SMART_URL else IPTV
+    if refresh_daemon.file_hash(save_path) != refresh_daemon.hashlib.sha256(content.encode("utf-8")).hexdigest():
+        with open(save_path, "w", encoding="utf-8") as f:
+            f.write(content)
+    return True
+
+
+def test_second_tick_runs_nothing(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(refresh_daemon, "run_script", fake_run_script)
+    monkeypatch.setattr(refresh_daemon, "fetch", fake_fetch)
+    os.makedirs(refresh_daemon.STATE_DIR)
+    (tmp_path / "1.m3u").write_text("#EXTM3U\n", encoding="utf-8")
+    state = {}
+    jobs = refresh_daemon.build_jobs(state, iptv_url="http://upstream.example/iptv.m3u")
+
+    assert refresh_daemon.tick(jobs, state) == len(jobs)
+    published = (tmp_path / "li.m3u").read_text(encoding="utf-8")
+    # 台标与 EPG 地址的改写不会触发 sync_li 把上游 x-tvg-url 写回
+    assert refresh_daemon.tick(jobs, state) == 0
+    assert (tmp_path / "li.m3u").read_text(encoding="utf-8") == published
+    assert f'x-tvg-url="{EPG_URL}"' in published and "logo.example" not in published
+
+
+class EtagOrigin(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = IPTV.encode("utf-8")
+        self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def test_fetch_recovers_missing_file_despite_stored_etag(tmp_path):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), EtagOrigin)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    save_path = tmp_path / "iptv.m3u"
+    record = {"etag": '"v1"'}
+    try:
+        assert refresh_daemon.fetch(f"http://127.0.0.1:{server.server_address[1]}/iptv.m3u", str(save_path), record)
+    finally:
+        server.shutdown()
+    assert save_path.read_text(encoding="utf-8") == IPTV
+
+
+def git(cwd, *args):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def clone(remote, path):
+    git(remote.parent, "clone", "-q", str(remote), str(path))
+    git(path, "config", "user.name", "test")
+    git(path, "config", "user.email", "test@example.com")
+    return path
+
+
+def test_publish_rebases_onto_concurrent_pushes(tmp_path, monkeypatch):
+    remote = tmp_path / "remote.git"
+    git(tmp_path, "init", "-q", "--bare", "-b", "master", str(remote))
+    seed = clone(remote, tmp_path / "seed")
+    (seed / "li.m3u").write_text("#EXTM3U\nold\n", encoding="utf-8")
+    (seed / "README.md").write_text("x\n", encoding="utf-8")
+    git(seed, "add", ".")
+    git(seed, "commit", "-q", "-m", "init")
+    git(seed, "push", "-q", "origin", "master")
+    daemon = clone(remote, tmp_path / "daemon")
+
+    # 定时工作流在此期间推送了提交，其中也改了 li.m3u
+    (seed / "li.m3u").write_text("#EXTM3U\ncron\n", encoding="utf-8")
+    (seed / "README.md").write_text("y\n", encoding="utf-8")
+    git(seed, "commit", "-q", "-am", "cron")
+    git(seed, "push", "-q", "origin", "master")
+
+    monkeypatch.chdir(daemon)
+    (daemon / "li.m3u").write_text("#EXTM3U\ndaemon\n", encoding="utf-8")
+    assert refresh_daemon.publish(["li.m3u"])
+    assert git(remote, "show", "master:li.m3u") == "#EXTM3U\ndaemon"
+    assert git(remote, "show", "master:README.md") == "y"
+    # 没有新产物时不产生提交
+    assert refresh_daemon.publish(["li.m3u"])
+    assert git(remote, "rev-list", "--count", "master") == "3"
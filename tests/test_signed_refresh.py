@@ -0,0 +1,55 @@
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import signed_refresh
+
+
+class Origin(BaseHTTPRequestHandler):
+    """/live/* 为可用的 m3u8（/live/old* 已过期），/source 为上游列表"""
+    source = ""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/source":
+            body = self.source.encode("utf-8")
+        elif self.path.startswith("/live/") and not self.path.startswith("/live/old"):
+            body = b"#EXTM3U\n"
+        else:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def playlist(base, urls):
+    lines = ["#EXTM3U", '#EXTINF:-1 tvg-name="凤凰中文" group-title="三只鸟",凤凰中文台']
+    return "\n".join(lines + [f"{base}/live/{u}?sign=x" for u in urls]) + "\n"
+
+
+def test_urls_under_one_extinf_keep_separate_state(tmp_path, monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Origin)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    Origin.source = playlist(base, ["a", "new-b"])
+    live = tmp_path / "li.m3u"
+    live.write_text(playlist(base, ["a", "old-b"]), encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    try:
+        assert signed_refresh.check_once(str(live), f"{base}/source") == 1
+        first = signed_refresh.load_state()
+        assert signed_refresh.check_once(str(live), f"{base}/source") == 0
+        second = signed_refresh.load_state()
+    finally:
+        server.shutdown()
+    # 只替换失效的第二个地址，第一个地址保持不变
+    assert live.read_text(encoding="utf-8") == playlist(base, ["a", "new-b"])
+    assert sorted(second) == ["三只鸟/凤凰中文", "三只鸟/凤凰中文#1"]
+    assert second["三只鸟/凤凰中文"]["url"].startswith(f"{base}/live/a")
+    # 签发时间不会在每轮被重置
+    assert all(second[k]["issued"] == first[k]["issued"] for k in second)
@@ -0,0 +1,101 @@
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+N = 10
+PAGE = ('<html><script id="__NEXT_DATA__" type="application/json">'
+        '{"props": {"pageProps": {"ok": 1}}}</script></html>').encode("utf-8")
+
+
+class SlowPage(BaseHTTPRequestHandler):
+    hits = 0
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        with SlowPage.lock:
+            SlowPage.hits += 1
+        # 拖慢响应，保证所有调用方都在请求进行中到达
+        time.sleep(0.3)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+
+@pytest.fixture
+def stub():
+    SlowPage.hits = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowPage)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def run_threads(target, n=N):
+    barrier = threading.Barrier(n)
+    results = [None] * n
+
+    def worker(i):
+        barrier.wait()
+        try:
+            results[i] = target()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_concurrent_fetch_page_sends_one_upstream_request(hema, stub):
+    spider = hema.Spider()
+    results = run_threads(lambda: spider.fetchPage(stub + "/episode/1"))
+    assert SlowPage.hits == 1
+    assert all(r is results[0] for r in results)
+    assert results[0]["nextData"] == {"props": {"pageProps": {"ok": 1}}}
+
+
+def test_sequential_calls_are_not_coalesced(hema, stub):
+    spider = hema.Spider()
+    spider.fetchPage(stub + "/episode/1")
+    spider.fetchPage(stub + "/episode/1")
+    assert SlowPage.hits == 2
+
+
+def test_error_propagates_to_all_waiters(hema):
+    flight = hema.SingleFlight()
+    calls = []
+
+    def fail():
+        calls.append(1)
+        time.sleep(0.3)
+        raise ValueError("upstream down")
+
+    results = run_threads(lambda: flight.do("k", fail))
+    assert len(calls) == 1
+    assert all(isinstance(r, ValueError) and str(r) == "upstream down" for r in results)
+
+
+def test_waiter_times_out_while_leader_is_stuck(hema):
+    flight = hema.SingleFlight()
+    release = threading.Event()
+    leader = threading.Thread(target=lambda: flight.do("k", lambda: release.wait(5)))
+    leader.start()
+    time.sleep(0.1)
+    try:
+        with pytest.raises(TimeoutError):
+            flight.do("k", lambda: "not called", timeout=0.2)
+    finally:
+        release.set()
+        leader.join()
+    # 领头调用结束后，新的调用重新执行
+    assert flight.do("k", lambda: "fresh") == "fresh"
@@ -0,0 +1,90 @@
+import json
+import time
+import threading
+import multiprocessing
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import spider_server
+
+SPIDER = '''
+import os, time
+
+class Spider:
+    def init(self, extend=""):
+        pass
+
+    def detailContent(self, ids):
+        with open(os.environ["SPIDER_CALLS"], "a") as f:
+            f.write(ids[0] + "\\n")
+        time.sleep(0.6)
+        return {"list": [{"vod_id": ids[0]}]}
+'''
+
+
+def test_retry_after_timeout_waits_for_the_running_call(tmp_path, monkeypatch):
+    spider_file = tmp_path / "slow_spider.py"
+    spider_file.write_text(SPIDER, encoding="utf-8")
+    calls = tmp_path / "calls.txt"
+    monkeypatch.setenv("SPIDER_CALLS", str(calls))
+    runtime = spider_server.SpiderRuntime(str(spider_file), workers=2, timeout=0.2)
+    try:
+        # 工作进程仍在执行时，超时后的重试不再重复派发
+        for _ in range(2):
+            with pytest.raises(multiprocessing.TimeoutError):
+                runtime.call("detail", "detailContent", ["1"])
+        assert len(runtime.pending) == 1
+        time.sleep(0.6)
+        # 迟到的结果由回调写入缓存
+        assert runtime.call("detail", "detailContent", ["1"]) == {"list": [{"vod_id": "1"}]}
+        assert runtime.pending == {} and runtime.hits == 1
+    finally:
+        runtime.close()
+    assert calls.read_text().split() == ["1"]
+
+
+HINT_SPIDER = '''
+import json
+
+class Spider:
+    def init(self, extend=""):
+        self.quality = json.loads(extend or "{}").get("quality", "auto")
+
+    def detailContent(self, ids):
+        return {"list": [{"vod_id": ids[0], "quality": self.quality}]}
+
+    def localProxy(self, param):
+        return [200, "video/MP2T", {}, param]
+'''
+
+
+def test_client_hints_and_proxy_bodies(tmp_path):
+    spider_file = tmp_path / "hint_spider.py"
+    spider_file.write_text(HINT_SPIDER, encoding="utf-8")
+    runtime = spider_server.SpiderRuntime(str(spider_file), workers=1)
+    spider_server.Handler.runtime = runtime
+    server = ThreadingHTTPServer(("127.0.0.1", 0), spider_server.Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    get = lambda path: urllib.request.urlopen(base + path, timeout=10)
+    try:
+        detail = lambda prefix: json.load(get(f"{prefix}/?ac=detail&ids=1"))["list"][0]["quality"]
+        assert detail("") == "auto"
+        # 带参数的盒子使用各自的实例与缓存，不影响其他盒子
+        assert detail("/quality=low") == "low"
+        assert detail("") == "auto"
+        assert detail("/quality=low") == "low" and runtime.hits == 2
+
+        # dict 内容序列化为 JSON，而不是写出一半的响应
+        with get("/proxy?url=x") as response:
+            assert response.status == 200
+            assert response.headers["Content-Type"].startswith("application/json")
+            assert json.load(response) == {"url": "x"}
+        with get("/quality=low/proxy?url=y") as response:
+            assert json.load(response) == {"url": "y"}
+    finally:
+        server.shutdown()
+        server.server_close()
+        runtime.close()
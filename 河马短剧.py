@@ -1,9 +1,12 @@
 # -*- coding: utf-8 -*-
-import requests
 import re
 import json
-import traceback
 import sys
+import threading
+import time
+import os
+import struct
+import importlib
 
 sys.path.append('../../')
 try:
@@ -14,39 +17,152 @@ except ImportError:
         def init(self, extend=""):
             pass
 
+class LazyModule:
+    """首次访问属性时才导入模块，避免盒子加载爬虫时就付出 requests 等重依赖的导入开销"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+requests = LazyModule("requests")
+traceback = LazyModule("traceback")
+tempfile = LazyModule("tempfile")
+
+NEXT_DATA_PATTERN = re.compile(r'<script id="__NEXT_DATA__" type="application/json">(.*?)</script>', re.DOTALL)
+FLIGHT_TIMEOUT = 15  # 等待同一请求结果的最长时间（秒）
+# 各清晰度（chapterVideoVo 字段, 名称），顺序即源站原有的取用顺序 mp4 → mp4720p → vodMp4Url。
+# 码率不做假设，由measureRenditions实测（文件大小 / 时长）；未测得时按此顺序取第一个可用地址
+RENDITIONS = [("mp4", "MP4"), ("mp4720p", "720P"), ("vodMp4Url", "备用")]
+RENDITION_PROBE_BYTES = 64 * 1024  # 测码率时读取的文件头字节数，时长取自其中的mvhd
+BANDWIDTH_HEADROOM = 1.5  # 带宽至少为码率的1.5倍才选用该清晰度，避免卡顿
+MIN_SAMPLE_BYTES = 32 * 1024  # 小于该大小的下载测不准吞吐量，不计入
+PROBE_BYTES = 256 * 1024  # 测速时从视频CDN读取的字节数
+PROBE_INTERVAL = 600  # 两次CDN测速的最小间隔（秒）
+MP4_PATTERN = re.compile(r'(https?://[^"\']+\.mp4)')
+BASE_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
+    "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8"
+}
+CATEGORIES = {
+    "甜宠": "462",
+    "古装仙侠": "1102",
+    "现代言情": "1145",
+    "青春": "1170",
+    "豪门恩怨": "585",
+    "逆袭": "417-464",
+    "重生": "439-465",
+    "系统": "1159",
+    "总裁": "1147",
+    "职场商战": "943"
+}
+HOME_CLASSES = [{'type_name': k, 'type_id': v} for k, v in CATEGORIES.items()]
+# 学到的MP4地址模板，跨剧集复用以省去第一集播放页请求
+# 为None时保存到系统临时目录，首次读写时才确定路径（gettempdir会导入random等模块并写探测文件）
+TEMPLATE_FILE = None
+MAX_TEMPLATES = 20
+MAX_TEMPLATE_TRIES = 2  # 每部剧最多抽查的模板数，每次抽查是一个Range请求（最长5秒）
+
+
+def mp4Duration(data):
+    """从MP4文件头的mvhd box读取时长（秒），没有mvhd时返回None"""
+    i = data.find(b"mvhd")
+    if i < 0:
+        return None
+    try:
+        if data[i + 4] == 1:
+            timescale, duration = struct.unpack(">IQ", data[i + 24:i + 36])
+        else:
+            timescale, duration = struct.unpack(">II", data[i + 16:i + 24])
+    except (IndexError, struct.error):
+        return None
+    return duration / timescale if timescale and duration else None
+
+
+class SingleFlight:
+    """相同 key 的并发调用只执行一次，其余调用等待并共享同一结果或异常"""
+
+    class _Call:
+        def __init__(self):
+            self.event = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, timeout=FLIGHT_TIMEOUT):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+        if leader:
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+                call.event.set()
+        elif not call.event.wait(timeout):
+            raise TimeoutError(f"等待请求超时: {key}")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+
 class Spider(Spider):
     def __init__(self):
         self.siteUrl = "https://www.kuaikaw.cn"
         self.nextData = None  # 缓存NEXT_DATA数据
-        self.cateManual = {
-            "甜宠": "462",
-            "古装仙侠": "1102",
-            "现代言情": "1145",
-            "青春": "1170",
-            "豪门恩怨": "585",
-            "逆袭": "417-464",
-            "重生": "439-465",
-            "系统": "1159",
-            "总裁": "1147",
-            "职场商战": "943"
-        }
+        self.flight = SingleFlight()  # 合并并发的相同请求
+        self.quality = "auto"  # auto按带宽选择，high/low固定最高/最低清晰度
+        self.bandwidthKbps = None  # extend中给定的带宽提示
+        self.throughputKbps = None  # 视频CDN测速得到的吞吐量（指数平均）
+        self.lastProbe = 0
+        self.renditionKbps = {}  # 各清晰度实测码率 {chapterVideoVo字段: kbps}
+        self.lastRenditionProbe = 0
+        self.multiSource = False  # 是否把各清晰度作为独立线路输出
+        self.templates = None  # {模板: {"hits": 成功次数, "fails": 失败次数}}，首次使用时加载
+        self.templateLock = threading.Lock()
+        self.cateManual = CATEGORIES
         
     def getName(self):
         # 返回爬虫名称
         return "河马短剧"
     
     def init(self, extend=""):
-        return
+        # extend 可为JSON：{"quality": "auto|high|low", "bandwidth": 带宽kbps, "multiSource": 1}
+        try:
+            cfg = extend if isinstance(extend, dict) else json.loads(extend or "{}")
+        except Exception:
+            cfg = {}
+        if not isinstance(cfg, dict):
+            return
+        self.quality = cfg.get("quality", self.quality)
+        if cfg.get("bandwidth"):
+            self.bandwidthKbps = float(cfg["bandwidth"])
+        self.multiSource = bool(cfg.get("multiSource", self.multiSource))
     
     def fetch(self, url, headers=None):
-        """统一的网络请求接口"""
+        """统一的网络请求接口，同一URL的并发请求只发出一次"""
+        return self.flight.do(("fetch", url), lambda: self._fetch(url, headers))
+
+    def defaultHeaders(self):
+        return dict(BASE_HEADERS, Referer=self.siteUrl)
+
+    def _fetch(self, url, headers=None):
         if headers is None:
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0",
-                "Referer": self.siteUrl,
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
-                "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8"
-            }
+            headers = self.defaultHeaders()
         
         try:
             response = requests.get(url, headers=headers, timeout=10, allow_redirects=True)
@@ -56,6 +172,197 @@ class Spider(Spider):
             print(f"请求异常: {url}, 错误: {str(e)}")
             return None
     
+    def fetchPage(self, url, headers=None):
+        """请求页面并解析NEXT_DATA，并发调用共享同一份解析结果（只读）"""
+        def load():
+            rsp = self.fetch(url, headers=headers)
+            if not rsp or rsp.status_code != 200:
+                print(f"请求失败，状态码: {getattr(rsp, 'status_code', 'N/A')}")
+                return None
+            html = rsp.text
+            next_data = None
+            next_data_match = NEXT_DATA_PATTERN.search(html)
+            if next_data_match:
+                try:
+                    next_data = json.loads(next_data_match.group(1))
+                except Exception as e:
+                    print(f"解析NEXT_DATA失败: {str(e)}")
+            return {"html": html, "nextData": next_data}
+        return self.flight.do(("page", url), load)
+
+    def recordThroughput(self, size, elapsed):
+        """记录一次下载的吞吐量，按指数加权平均平滑"""
+        if size < MIN_SAMPLE_BYTES or elapsed <= 0:
+            return
+        kbps = size * 8 / 1000 / elapsed
+        if self.throughputKbps is None:
+            self.throughputKbps = kbps
+        else:
+            self.throughputKbps = 0.7 * self.throughputKbps + 0.3 * kbps
+
+    def probeBandwidth(self, url):
+        """从视频CDN读取一小段测速，间隔PROBE_INTERVAL内只测一次
+
+        页面请求的耗时主要是源站生成页面的时间，不代表视频下载速度，因此只用CDN测速的数据；
+        计时从收到首个数据块开始，排除建连与首字节等待时间。
+        """
+        if self.quality != "auto" or self.bandwidthKbps or time.time() - self.lastProbe < PROBE_INTERVAL:
+            return
+        self.lastProbe = time.time()
+        try:
+            headers = {"Range": f"bytes=0-{PROBE_BYTES - 1}", "Referer": self.siteUrl}
+            with requests.get(url, headers=headers, timeout=5, stream=True) as response:
+                start = None
+                size = 0
+                for chunk in response.iter_content(chunk_size=16384):
+                    if start is None:
+                        start = time.time()
+                        continue
+                    size += len(chunk)
+                    if size >= PROBE_BYTES:
+                        break
+            if start is not None:
+                self.recordThroughput(size, time.time() - start)
+            print(f"CDN测速: {self.throughputKbps or 0:.0f}kbps")
+        except Exception as e:
+            print(f"CDN测速失败: {str(e)}")
+
+    def readMp4Head(self, url):
+        """Range读取MP4文件头，返回 (文件总字节数, 时长秒)，取不到的项为None"""
+        headers = {"Range": f"bytes=0-{RENDITION_PROBE_BYTES - 1}", "Referer": self.siteUrl}
+        with requests.get(url, headers=headers, timeout=5, stream=True) as response:
+            response.raise_for_status()
+            data = b""
+            for chunk in response.iter_content(chunk_size=16384):
+                data += chunk
+                if len(data) >= RENDITION_PROBE_BYTES:
+                    break
+            total = re.search(r'/(\d+)\s*$', response.headers.get("Content-Range", ""))
+            if total:
+                total = int(total.group(1))
+            elif response.status_code == 200 and response.headers.get("Content-Length"):
+                total = int(response.headers["Content-Length"])
+        return total or None, mp4Duration(data)
+
+    def measureRenditions(self, chapter_video):
+        """实测同一集各清晰度的码率，间隔PROBE_INTERVAL内只测一次
+
+        码率 = 文件大小 / 时长，大小取自Content-Range，时长取自文件头的mvhd；
+        同一集各清晰度时长相同，某个文件头缺少mvhd（moov在文件尾）时借用其他清晰度的时长。
+        """
+        keys = [key for key, _ in RENDITIONS if chapter_video.get(key)]
+        if len(keys) < 2 or time.time() - self.lastRenditionProbe < PROBE_INTERVAL:
+            return
+        self.lastRenditionProbe = time.time()
+        heads = {}
+        for key in keys:
+            try:
+                heads[key] = self.readMp4Head(chapter_video[key])
+            except Exception as e:
+                print(f"清晰度测码率失败: {key} → {str(e)}")
+        duration = next((d for _, d in heads.values() if d), None)
+        if not duration:
+            print("清晰度测码率失败: 文件头中没有时长信息")
+            return
+        for key, (total, own_duration) in heads.items():
+            if total:
+                self.renditionKbps[key] = total * 8 / 1000 / (own_duration or duration)
+        print("清晰度码率: " + ", ".join(f"{k} {v:.0f}kbps" for k, v in self.renditionKbps.items()))
+
+    def pickRendition(self, chapter_video):
+        """按带宽从chapterVideoVo中选择能流畅播放的最高清晰度"""
+        available = [key for key, _ in RENDITIONS if chapter_video.get(key)]
+        if not available:
+            return ""
+        self.measureRenditions(chapter_video)
+        rates = self.renditionKbps
+        if not all(key in rates for key in available):
+            # 码率未知时无法比较高低，保持源站原有顺序
+            return chapter_video[available[0]]
+        # 按实测码率由高到低排列，码率相同时保持RENDITIONS中的先后顺序
+        ranked = sorted(available, key=lambda key: -rates[key])
+        bandwidth = self.bandwidthKbps or self.throughputKbps
+        lowest = min(ranked, key=lambda key: rates[key])  # 码率最低者中取优先级最高的
+        if self.quality == "low":
+            choice = lowest
+        elif self.quality == "high" or bandwidth is None:
+            choice = ranked[0]
+        else:
+            fitting = [key for key in ranked if rates[key] * BANDWIDTH_HEADROOM <= bandwidth]
+            choice = fitting[0] if fitting else lowest
+        return chapter_video[choice]
+
+    def templateFile(self):
+        return TEMPLATE_FILE or os.path.join(tempfile.gettempdir(), "hema_mp4_templates.json")
+
+    def loadTemplates(self):
+        if self.templates is None:
+            try:
+                with open(self.templateFile(), "r", encoding="utf-8") as f:
+                    self.templates = json.load(f)
+            except Exception:
+                self.templates = {}
+        return self.templates
+
+    def saveTemplates(self):
+        try:
+            template_file = self.templateFile()
+            tmp_file = f"{template_file}.{os.getpid()}.tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(self.templates, f, ensure_ascii=False)
+            os.replace(tmp_file, template_file)
+        except Exception as e:
+            print(f"保存MP4模板失败: {str(e)}")
+
+    def learnTemplate(self, mp4_url, drama_id, chapter_id):
+        """从已解析的MP4地址中把剧集ID、章节ID替换为占位符，记为可复用的模板"""
+        if not mp4_url or not chapter_id or chapter_id not in mp4_url:
+            return
+        template = mp4_url.replace(chapter_id, "{chapter_id}")
+        # 过短的ID容易误替换地址中的其它片段
+        if drama_id and len(drama_id) >= 4 and drama_id in template:
+            template = template.replace(drama_id, "{drama_id}")
+        with self.templateLock:
+            templates = self.loadTemplates()
+            stat = templates.setdefault(template, {"hits": 0, "fails": 0})
+            stat["hits"] += 1
+            if len(templates) > MAX_TEMPLATES:
+                worst = min(templates, key=lambda t: templates[t]["hits"] - templates[t]["fails"])
+                templates.pop(worst, None)
+            self.saveTemplates()
+
+    def verifyUrl(self, url):
+        """用只取1字节的Range请求确认地址可播放"""
+        try:
+            headers = {"Range": "bytes=0-0", "Referer": self.siteUrl}
+            with requests.get(url, headers=headers, timeout=5, stream=True) as response:
+                content_type = response.headers.get("Content-Type", "")
+                return response.status_code in (200, 206) and "text/html" not in content_type
+        except Exception:
+            return False
+
+    def synthesizeFromTemplates(self, drama_id, chapter_id):
+        """抽查成功率最高的少数模板（成功多于失败者），返回通过校验的MP4地址；都不通过时由调用方回退到播放页"""
+        with self.templateLock:
+            templates = dict(self.loadTemplates())
+        ranked = sorted((t for t in templates
+                         if "{chapter_id}" in t and templates[t]["hits"] > templates[t]["fails"]),
+                        key=lambda t: templates[t]["hits"] - templates[t]["fails"], reverse=True)
+        for template in ranked[:MAX_TEMPLATE_TRIES]:
+            url = template.replace("{drama_id}", drama_id).replace("{chapter_id}", chapter_id)
+            ok = self.verifyUrl(url)
+            with self.templateLock:
+                stat = self.loadTemplates().get(template)
+                if stat is not None:
+                    stat["hits" if ok else "fails"] += 1
+                    if stat["fails"] > stat["hits"] + 3:
+                        self.templates.pop(template, None)
+                    self.saveTemplates()
+            if ok:
+                print(f"使用已学到的MP4模板: {template}")
+                return url
+        return None
+
     def isVideoFormat(self, url):
         # 检查是否为视频格式
         video_formats = ['.mp4', '.mkv', '.avi', '.wmv', '.m3u8', '.flv', '.rmvb']
@@ -69,23 +376,8 @@ class Spider(Spider):
         return False
     
     def homeContent(self, filter):
-        """获取首页分类及筛选"""
-        result = {}
-        # 分类列表，使用已初始化的cateManual
-        classes = []
-        for k in self.cateManual:
-            classes.append({
-                'type_name': k,
-                'type_id': self.cateManual[k]
-            })
-        result['class'] = classes
-        # 获取首页推荐视频
-        try:
-            result['list'] = self.homeVideoContent()['list']
-        except:
-            result['list'] = []
-  
-        return result
+        """获取首页分类及筛选（静态分类，不发网络请求；推荐视频由homeVideoContent单独加载）"""
+        return {'class': HOME_CLASSES, 'list': []}
     
     def homeVideoContent(self):
         """获取首页推荐视频内容"""
@@ -94,8 +386,7 @@ class Spider(Spider):
             response = self.fetch(self.siteUrl)
             html_content = response.text
             # 提取NEXT_DATA JSON数据
-            next_data_pattern = r'<script id="__NEXT_DATA__" type="application/json">(.*?)</script>'
-            next_data_match = re.search(next_data_pattern, html_content, re.DOTALL)
+            next_data_match = NEXT_DATA_PATTERN.search(html_content)
             if next_data_match:
                 next_data_json = json.loads(next_data_match.group(1))
                 page_props = next_data_json.get("props", {}).get("pageProps", {})
@@ -161,8 +452,7 @@ class Spider(Spider):
         response = self.fetch(url)
         html_content = response.text
         # 提取NEXT_DATA JSON数据
-        next_data_pattern = r'<script id="__NEXT_DATA__" type="application/json">(.*?)</script>'
-        next_data_match = re.search(next_data_pattern, html_content, re.DOTALL)
+        next_data_match = NEXT_DATA_PATTERN.search(html_content)
         if next_data_match:
             next_data_json = json.loads(next_data_match.group(1))
             page_props = next_data_json.get("props", {}).get("pageProps", {})
@@ -203,8 +493,7 @@ class Spider(Spider):
         response = self.fetch(url)
         html_content = response.text
         # 提取NEXT_DATA JSON数据
-        next_data_pattern = r'<script id="__NEXT_DATA__" type="application/json">(.*?)</script>'
-        next_data_match = re.search(next_data_pattern, html_content, re.DOTALL)
+        next_data_match = NEXT_DATA_PATTERN.search(html_content)
         if next_data_match:
             next_data_json = json.loads(next_data_match.group(1))
             page_props = next_data_json.get("props", {}).get("pageProps", {})
@@ -221,7 +510,7 @@ class Spider(Spider):
                     next_page_url = f"{self.siteUrl}/search?searchValue={key}&page={page}"
                     next_page_response = self.fetch(next_page_url)
                     next_page_html = next_page_response.text
-                    next_page_match = re.search(next_data_pattern, next_page_html, re.DOTALL)
+                    next_page_match = NEXT_DATA_PATTERN.search(next_page_html)
                     if next_page_match:
                         next_page_json = json.loads(next_page_match.group(1))
                         next_page_props = next_page_json.get("props", {}).get("pageProps", {})
@@ -275,27 +564,18 @@ class Spider(Spider):
         drama_url = self.siteUrl + vod_id
         print(f"请求URL: {drama_url}")
         
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0",
-            "Referer": self.siteUrl,
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
-            "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8"
-        }
+        headers = self.defaultHeaders()
         
-        rsp = self.fetch(drama_url, headers=headers)
-        if not rsp or rsp.status_code != 200:
-            print(f"请求失败，状态码: {getattr(rsp, 'status_code', 'N/A')}")
+        page = self.fetchPage(drama_url, headers=headers)
+        if not page:
             return {}
         
-        html = rsp.text
-        next_data_match = re.search(r'<script id="__NEXT_DATA__" type="application/json">(.*?)</script>', html, re.DOTALL)
-        
-        if not next_data_match:
+        if not page["nextData"]:
             print("未找到NEXT_DATA内容")
             return {}
         
         try:
-            next_data = json.loads(next_data_match.group(1))
+            next_data = page["nextData"]
             page_props = next_data.get("props", {}).get("pageProps", {})
             print(f"找到页面属性，包含 {len(page_props.keys())} 个键")
             
@@ -331,45 +611,55 @@ class Spider(Spider):
             if chapter_list:
                 print(f"找到 {len(chapter_list)} 个章节")
                 
-                # 先检查是否有可以直接使用的MP4链接作为模板
                 mp4_template = None
                 first_mp4_chapter_id = None
+                drama_id_clean = vod_id.replace('/drama/', '')
+                
+                # 1. 章节对象自带chapterVideoVo时直接取用，不需要任何额外请求
+                for chapter in chapter_list[:5]:  # 只检查前5个章节以提高效率
+                    if "chapterVideoVo" in chapter and chapter["chapterVideoVo"]:
+                        chapter_video = chapter["chapterVideoVo"]
+                        mp4_url = self.pickRendition(chapter_video)
+                        if mp4_url and ".mp4" in mp4_url:
+                            mp4_template = mp4_url
+                            first_mp4_chapter_id = chapter.get("chapterId", "")
+                            print(f"从chapterVideoVo找到MP4链接模板: {mp4_template}")
+                            print(f"模板对应的章节ID: {first_mp4_chapter_id}")
+                            break
+                
+                first_chapter_id = chapter_list[0].get("chapterId", "")
+                if not mp4_template and first_chapter_id and drama_id_clean:
+                    # 2. 用已学到的模板合成第一集的MP4链接，只抽查排名最前的少数模板，校验通过则省去播放页请求
+                    mp4_template = self.synthesizeFromTemplates(drama_id_clean, first_chapter_id)
+                    if mp4_template:
+                        first_mp4_chapter_id = first_chapter_id
                 
-                # 先搜索第一个章节的MP4链接
-                # 为提高成功率，尝试直接请求第一个章节的播放页
-                if chapter_list and len(chapter_list) > 0:
-                    first_chapter = chapter_list[0]
-                    first_chapter_id = first_chapter.get("chapterId", "")
-                    drama_id_clean = vod_id.replace('/drama/', '')
+                if not mp4_template and first_chapter_id and drama_id_clean:
+                    # 3. 请求第一个章节的播放页提取链接，并从中学习模板
+                    first_episode_url = f"{self.siteUrl}/episode/{drama_id_clean}/{first_chapter_id}"
+                    print(f"请求第一集播放页: {first_episode_url}")
                     
-                    if first_chapter_id and drama_id_clean:
-                        first_episode_url = f"{self.siteUrl}/episode/{drama_id_clean}/{first_chapter_id}"
-                        print(f"请求第一集播放页: {first_episode_url}")
-                        
-                        first_rsp = self.fetch(first_episode_url, headers=headers)
-                        if first_rsp and first_rsp.status_code == 200:
-                            first_html = first_rsp.text
-                            # 直接从HTML提取MP4链接
-                            mp4_pattern = r'(https?://[^"\']+\.mp4)'
-                            mp4_matches = re.findall(mp4_pattern, first_html)
-                            if mp4_matches:
-                                mp4_template = mp4_matches[0]
-                                first_mp4_chapter_id = first_chapter_id
-                                print(f"找到MP4链接模板: {mp4_template}")
-                                print(f"模板对应的章节ID: {first_mp4_chapter_id}")
+                    first_page = self.fetchPage(first_episode_url, headers=headers)
+                    if first_page:
+                        first_html = first_page["html"]
+                        # 直接从HTML提取MP4链接
+                        mp4_matches = MP4_PATTERN.findall(first_html)
+                        if mp4_matches:
+                            mp4_template = mp4_matches[0]
+                            first_mp4_chapter_id = first_chapter_id
+                            self.learnTemplate(mp4_template, drama_id_clean, first_chapter_id)
+                            print(f"找到MP4链接模板: {mp4_template}")
+                            print(f"模板对应的章节ID: {first_mp4_chapter_id}")
                 
-                # 如果未找到模板，再检查章节对象中是否有MP4链接
-                if not mp4_template:
-                    for chapter in chapter_list[:5]:  # 只检查前5个章节以提高效率
-                        if "chapterVideoVo" in chapter and chapter["chapterVideoVo"]:
-                            chapter_video = chapter["chapterVideoVo"]
-                            mp4_url = chapter_video.get("mp4", "") or chapter_video.get("mp4720p", "") or chapter_video.get("vodMp4Url", "")
-                            if mp4_url and ".mp4" in mp4_url:
-                                mp4_template = mp4_url
-                                first_mp4_chapter_id = chapter.get("chapterId", "")
-                                print(f"从chapterVideoVo找到MP4链接模板: {mp4_template}")
-                                print(f"模板对应的章节ID: {first_mp4_chapter_id}")
-                                break
+                if mp4_template:
+                    self.probeBandwidth(mp4_template)
+                
+                # 多线路模式下，每个出现过的清晰度单独成一条线路
+                rendition_sources = {}
+                if self.multiSource:
+                    for key, _ in RENDITIONS:
+                        if any((c.get("chapterVideoVo") or {}).get(key) for c in chapter_list):
+                            rendition_sources[key] = []
                 
                 # 遍历所有章节处理播放信息
                 for chapter in chapter_list:
@@ -379,9 +669,11 @@ class Spider(Spider):
                     # 1. 如果章节自身有MP4链接，直接使用
                     if "chapterVideoVo" in chapter and chapter["chapterVideoVo"]:
                         chapter_video = chapter["chapterVideoVo"]
-                        mp4_url = chapter_video.get("mp4", "") or chapter_video.get("mp4720p", "") or chapter_video.get("vodMp4Url", "")
+                        mp4_url = self.pickRendition(chapter_video)
                         if mp4_url and ".mp4" in mp4_url:
                             episodes.append(f"{chapter_name}${mp4_url}")
+                            for key, items in rendition_sources.items():
+                                items.append(f"{chapter_name}${chapter_video.get(key) or mp4_url}")
                             continue
                     
                     # 2. 如果有MP4模板，尝试替换章节ID构建MP4链接
@@ -390,12 +682,16 @@ class Spider(Spider):
                         if first_mp4_chapter_id in mp4_template:
                             new_mp4_url = mp4_template.replace(first_mp4_chapter_id, chapter_id)
                             episodes.append(f"{chapter_name}${new_mp4_url}")
+                            for items in rendition_sources.values():
+                                items.append(episodes[-1])
                             continue
                     
                     # 3. 如果上述方法都不可行，回退到使用chapter_id构建中间URL
                     if chapter_id and chapter_name:
                         url = f"{vod_id}${chapter_id}${chapter_name}"
                         episodes.append(f"{chapter_name}${url}")
+                        for items in rendition_sources.values():
+                            items.append(episodes[-1])
             
             if not episodes and vod_id:
                 # 尝试构造默认的集数
@@ -418,7 +714,13 @@ class Spider(Spider):
             
             if episodes:
                 play_url_list.append("#".join(episodes))
-                vod['vod_play_from'] = '河马剧场'
+                play_from_list = ['河马剧场']
+                labels = dict(RENDITIONS)
+                for key, items in rendition_sources.items():
+                    if len(items) == len(episodes):
+                        play_url_list.append("#".join(items))
+                        play_from_list.append(f"河马{labels[key]}")
+                vod['vod_play_from'] = '$$$'.join(play_from_list)
                 vod['vod_play_url'] = '$$$'.join(play_url_list)
             
             result = {
@@ -434,12 +736,7 @@ class Spider(Spider):
         result = {}
         print(f"调用playerContent: flag={flag}, id={id}")
         
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0",
-            "Referer": self.siteUrl,
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
-            "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8"
-        }
+        headers = self.defaultHeaders()
         
         # 解析id参数
         parts = id.split('$')
@@ -473,26 +770,24 @@ class Spider(Spider):
         print(f"请求episode页面: {episode_url}")
         
         try:
-            rsp = self.fetch(episode_url, headers=headers)
-            if not rsp or rsp.status_code != 200:
-                print(f"请求失败，状态码: {getattr(rsp, 'status_code', 'N/A')}")
+            page = self.fetchPage(episode_url, headers=headers)
+            if not page:
                 result["parse"] = 0
                 result["url"] = id
                 result["header"] = json.dumps(headers)
                 return result
             
-            html = rsp.text
+            html = page["html"]
             print(f"获取页面大小: {len(html)} 字节")
             
             # 尝试从NEXT_DATA提取视频链接
             mp4_url = None
             
             # 方法1: 从NEXT_DATA提取
-            next_data_match = re.search(r'<script id="__NEXT_DATA__" type="application/json">(.*?)</script>', html, re.DOTALL)
-            if next_data_match:
+            if page["nextData"]:
                 try:
                     print("找到NEXT_DATA")
-                    next_data = json.loads(next_data_match.group(1))
+                    next_data = page["nextData"]
                     page_props = next_data.get("props", {}).get("pageProps", {})
                     
                     # 从chapterList中查找当前章节
@@ -503,7 +798,7 @@ class Spider(Spider):
                         if chapter.get("chapterId") == chapter_id:
                             print(f"找到匹配的章节: {chapter.get('chapterName')}")
                             chapter_video = chapter.get("chapterVideoVo", {})
-                            mp4_url = chapter_video.get("mp4", "") or chapter_video.get("mp4720p", "") or chapter_video.get("vodMp4Url", "")
+                            mp4_url = self.pickRendition(chapter_video)
                             if mp4_url:
                                 print(f"从chapterList找到MP4链接: {mp4_url}")
                                 break
@@ -514,7 +809,7 @@ class Spider(Spider):
                         if current_chapter:
                             print("找到当前章节信息")
                             chapter_video = current_chapter.get("chapterVideoVo", {})
-                            mp4_url = chapter_video.get("mp4", "") or chapter_video.get("mp4720p", "") or chapter_video.get("vodMp4Url", "")
+                            mp4_url = self.pickRendition(chapter_video)
                             if mp4_url:
                                 print(f"从chapterInfo找到MP4链接: {mp4_url}")
                 except Exception as e:
@@ -523,8 +818,7 @@ class Spider(Spider):
             
             # 方法2: 直接从HTML中提取MP4链接
             if not mp4_url:
-                mp4_pattern = r'(https?://[^"\']+\.mp4)'
-                mp4_matches = re.findall(mp4_pattern, html)
+                mp4_matches = MP4_PATTERN.findall(html)
                 if mp4_matches:
                     # 查找含有chapter_id的链接
                     matched_mp4 = False
@@ -542,6 +836,7 @@ class Spider(Spider):
             
             if mp4_url and ".mp4" in mp4_url:
                 print(f"最终找到的MP4链接: {mp4_url}")
+                self.learnTemplate(mp4_url, drama_id_clean, chapter_id)
                 result["parse"] = 0
                 result["url"] = mp4_url
                 result["header"] = json.dumps(headers)
@@ -549,8 +844,7 @@ class Spider(Spider):
             else:
                 print(f"未找到有效的MP4链接，尝试再次解析页面内容")
                 # 再尝试一次从HTML中广泛搜索所有可能的MP4链接
-                all_mp4_pattern = r'(https?://[^"\']+\.mp4)'
-                all_mp4_matches = re.findall(all_mp4_pattern, html)
+                all_mp4_matches = MP4_PATTERN.findall(html)
                 if all_mp4_matches:
                     mp4_url = all_mp4_matches[0]
                     print(f"从HTML广泛搜索找到MP4链接: {mp4_url}")